@@ -2,6 +2,8 @@ from app import BOT, bot, Message, Config
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import re
 
+from ..utils.peer_cache import PEER_CACHE
+
 
 def is_authorized(user_id: int) -> bool:
     return user_id in [Config.OWNER_ID, *Config.SUDO_USERS]
@@ -42,8 +44,8 @@ async def edit_channel_post(bot: BOT, message: Message):
             if is_private:
                 channel_id = int(f"-100{channel_ref}")
             else:
-                chat = await bot.get_chat(channel_ref)
-                channel_id = chat.id
+                chat = await PEER_CACHE.get_chat(channel_ref)
+                channel_id = chat["id"]
         else:
             if "/" not in post_reference:
                 await message.reply("❌ Invalid format.")
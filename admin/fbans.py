@@ -1,29 +1,200 @@
 import asyncio
 import re
+from collections import defaultdict
+from enum import Enum
+from io import BytesIO
 
 from pyrogram import filters
+from pyrogram.enums import ChatMembersFilter
+from pyrogram.errors import FloodWait
 from pyrogram.types import Chat, User
 from ub_core.utils.helpers import get_name
 
 from app import BOT, Config, CustomDB, Message, bot, extra_config
 
-FBAN_TASK_LOCK = asyncio.Lock()
+from ..utils.cached_db import cached_collection
+from .fed_limiter import FED_BOT_IDS, FED_LIMITER
 
-FED_DB = CustomDB["FED_LIST"]
+FED_DB = cached_collection("FED_LIST")
 
-BASIC_FILTER = filters.user([609517172, 2059887769, 1376954911, 885745757]) & ~filters.service
+# Queued/in-flight fed tasks, kept until every (user, fed) pair is done.
+FED_TASK_DB = CustomDB["FED_TASKS"]
 
-FBAN_REGEX = BASIC_FILTER & filters.regex(
-    r"(New FedBan|"
-    r"starting a federation ban|"
-    r"start a federation ban|"
-    r"FedBan Reason update|"
-    r"FedBan reason updated|"
-    r"Would you like to update this reason)",
+# Max number of fed chats talked to at once, across all running jobs.
+FED_TASK_CONCURRENCY: int = getattr(extra_config, "FBAN_CONCURRENCY", 20)
+
+# Jobs run side by side, so the next user's commands go out
+# while the previous user's replies are still awaited.
+FED_TASK_WORKERS: int = getattr(extra_config, "FBAN_WORKERS", 3)
+
+FED_TASK_QUEUE: asyncio.Queue[str] = asyncio.Queue()
+FED_TASK_SEMAPHORE = asyncio.Semaphore(FED_TASK_CONCURRENCY)
+FED_CHAT_LOCKS: defaultdict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+FED_TASK_PROGRESS: dict[str, Message] = {}
+FED_TASK_WORKER_TASKS: list[asyncio.Task] = []
+
+# Times a send is retried after a FloodWait before the fed is marked failed.
+FLOOD_RETRIES = 2
+
+# Bulk fban: a target is a user id or an @username.
+BULK_TARGET_REGEX = re.compile(r"\d+|@\w{4,}")
+# How far back a replied message range may reach.
+BULK_RANGE_LIMIT = 1000
+# Seconds between progress edits while a bulk job runs.
+BULK_PROGRESS_INTERVAL = 5
+
+BASIC_FILTER = filters.user(FED_BOT_IDS) & ~filters.service
+
+
+class FedOutcome(Enum):
+    NEW_BAN = "New FedBan"
+    REASON_UPDATED = "Reason updated"
+    UPDATE_PROMPT = "Update reason prompt"
+    UNBAN = "Un-FedBan"
+    ALREADY_BANNED = "Already banned"
+    NOT_ADMIN = "Not a fed admin"
+
+
+# One alternation with a named group per outcome, so a bot reply is scanned once.
+FED_RESPONSE_REGEX = re.compile(
+    r"(?P<UPDATE_PROMPT>Would you like to update this reason)"
+    r"|(?P<NOT_ADMIN>only federation admins|(?:not|aren't) (?:a )?fed(?:eration)? admin)"
+    r"|(?P<REASON_UPDATED>FedBan Reason update)"
+    r"|(?P<UNBAN>New un-FedBan|I'll give|Un-FedBan)"
+    r"|(?P<NEW_BAN>New FedBan|start(?:ing)? a federation ban)"
+    r"|(?P<ALREADY_BANNED>already (?:f(?:ed)?)?banned)",
     re.IGNORECASE,
 )
 
-UNFBAN_REGEX = BASIC_FILTER & filters.regex(r"(New un-FedBan|I'll give|Un-FedBan)", re.IGNORECASE)
+# When a reply matches more than one phrase, the earlier outcome here wins.
+# Bots echo the reason back, so NOT_ADMIN comes last: a real "not admin"
+# reply never also carries a ban/unban header, a reason can mention anything.
+FED_OUTCOME_PRIORITY: list[FedOutcome] = [
+    FedOutcome.UPDATE_PROMPT,
+    FedOutcome.REASON_UPDATED,
+    FedOutcome.UNBAN,
+    FedOutcome.NEW_BAN,
+    FedOutcome.ALREADY_BANNED,
+    FedOutcome.NOT_ADMIN,
+]
+
+FED_TASK_COMMANDS: dict[str, str] = {"Fban": "/fban", "Un-FBan": "/unfban"}
+
+# Outcomes that end the wait for each task type.
+FED_TASK_OUTCOMES: dict[str, set[FedOutcome]] = {
+    "Fban": {
+        FedOutcome.NEW_BAN,
+        FedOutcome.REASON_UPDATED,
+        FedOutcome.UPDATE_PROMPT,
+        FedOutcome.ALREADY_BANNED,
+        FedOutcome.NOT_ADMIN,
+    },
+    "Un-FBan": {FedOutcome.UNBAN, FedOutcome.NOT_ADMIN},
+}
+
+
+def classify_fed_response(
+    text: str | None, outcomes: set[FedOutcome] | None = None
+) -> FedOutcome | None:
+    r"""
+    Scan a fed bot reply once and return what it means, if anything.
+    With outcomes, only those are considered, so phrases from an echoed
+    reason can't turn a ban reply into something the waiter doesn't expect.
+
+    >>> fban = FED_TASK_OUTCOMES["Fban"]
+    >>> classify_fed_response("New FedBan\nReason: scam, I'll give refunds", fban).name
+    'NEW_BAN'
+    >>> classify_fed_response("New FedBan\nReason: claims he is not a fed admin", fban).name
+    'NEW_BAN'
+    >>> prompt = "User is already fedbanned.\nWould you like to update this reason?"
+    >>> classify_fed_response(prompt, fban).name
+    'UPDATE_PROMPT'
+    >>> classify_fed_response("User is already fbanned", fban).name
+    'ALREADY_BANNED'
+    >>> classify_fed_response("Only federation admins can do this", fban).name
+    'NOT_ADMIN'
+    >>> unfban = FED_TASK_OUTCOMES["Un-FBan"]
+    >>> classify_fed_response("New un-FedBan\nReason: New FedBan was a mistake", unfban).name
+    'UNBAN'
+    """
+    if not text:
+        return
+
+    found: set[str] = {match.lastgroup for match in FED_RESPONSE_REGEX.finditer(text)}
+
+    for outcome in FED_OUTCOME_PRIORITY:
+        if outcome.name in found and (outcomes is None or outcome in outcomes):
+            return outcome
+
+
+class FedResponseRouter:
+    """
+    Hands fed bot replies to the fed task waiting on them.
+    Waiters are kept by chat and by the id of the command they sent,
+    so each incoming message costs one dict lookup and one classification
+    no matter how many feds are in flight.
+    """
+
+    def __init__(self):
+        self.by_chat: dict[int, tuple[asyncio.Future, set[FedOutcome]]] = {}
+        self.by_reply: dict[tuple[int, int], tuple[asyncio.Future, set[FedOutcome]]] = {}
+
+    def expect(self, chat_id: int, outcomes: set[FedOutcome]) -> asyncio.Future:
+        """Register a waiter before sending, so a fast reply can't be missed."""
+        future = asyncio.get_running_loop().create_future()
+        self.by_chat[chat_id] = (future, outcomes)
+        return future
+
+    def bind_reply(self, chat_id: int, message_id: int):
+        waiter = self.by_chat.get(chat_id)
+        if waiter:
+            self.by_reply[(chat_id, message_id)] = waiter
+
+    async def wait(
+        self, chat_id: int, message_id: int, future: asyncio.Future, timeout: float
+    ) -> tuple[Message, FedOutcome] | None:
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.discard(chat_id=chat_id, future=future, message_id=message_id)
+
+    def discard(self, chat_id: int, future: asyncio.Future, message_id: int | None = None):
+        if not future.done():
+            future.cancel()
+        if self.by_chat.get(chat_id, (None,))[0] is future:
+            self.by_chat.pop(chat_id)
+        if message_id:
+            self.by_reply.pop((chat_id, message_id), None)
+
+    async def dispatch(self, message: Message):
+        chat_id = message.chat.id
+
+        waiter = None
+        if message.reply_to_message_id:
+            # A reply to another command (e.g. one that already timed out) isn't ours
+            waiter = self.by_reply.get((chat_id, message.reply_to_message_id))
+        else:
+            waiter = self.by_chat.get(chat_id)
+        if waiter is None:
+            return
+
+        future, outcomes = waiter
+        if future.done():
+            return
+
+        outcome = classify_fed_response(message.text, outcomes)
+        if outcome in outcomes:
+            future.set_result((message, outcome))
+
+
+FED_RESPONSES = FedResponseRouter()
+
+
+@bot.on_message(BASIC_FILTER, group=1)
+async def route_fed_response(bot: BOT, message: Message):
+    await FED_RESPONSES.dispatch(message)
 
 
 @bot.add_cmd(cmd="addf")
@@ -111,11 +282,25 @@ async def fed_ban(bot: BOT, message: Message):
         and appends the link in reason.
     FLAGS:
         -nrc: Don't do sudo fban
+        -s: Go through feds one at a time instead of concurrently
+        -b: Bulk fban, users are taken from
+            the ids/@usernames before the reason,
+            a replied text file of ids/@usernames,
+            or the senders of every message from the replied one up to this one
     USAGE:
         .fban(p) [uid | @ | reply to message] reason
+        .fban -b uid @user uid reason | .fban -b reason (reply to a file / message)
     """
     progress: Message = await message.reply("❯")
 
+    if "-b" in message.flags:
+        # In bulk mode the reply is the target source, so it can't be a proof too.
+        if message.cmd == "fbanp":
+            await progress.edit("Proof isn't supported with -b, use .fban -b")
+            return
+        await bulk_fed_ban(message=message, progress=progress)
+        return
+
     extracted_info = await get_user_reason(message=message, progress=progress)
 
     if not extracted_info:
@@ -152,13 +337,8 @@ async def fed_ban(bot: BOT, message: Message):
         if bot_resp and "anonymous" in bot_resp.text.lower() and bot_resp.reply_markup:
             await bot_resp.click(0)
 
-    fban_cmd: str = f"/fban <a href='tg://user?id={user_id}'>{user_id}</a> {reason}"
-
     await perform_fed_task(
-        user_id=user_id,
-        user_mention=user_mention,
-        command=fban_cmd,
-        task_filter=FBAN_REGEX,
+        targets=[(user_id, user_mention)],
         task_type="Fban",
         reason=reason,
         progress=progress,
@@ -174,6 +354,7 @@ async def un_fban(bot: BOT, message: Message):
         Initiates a fed-unban in fed-chats added in .addf
     FLAGS:
         -nrc: Don't do sudo unfban
+        -s: Go through feds one at a time instead of concurrently
     USAGE:
         .unfban [uid | @ | reply to message] reason
     """
@@ -185,13 +366,9 @@ async def un_fban(bot: BOT, message: Message):
         return
 
     user_id, user_mention, reason = extracted_info
-    unfban_cmd: str = f"/unfban <a href='tg://user?id={user_id}'>{user_id}</a> {reason}"
 
     await perform_fed_task(
-        user_id=user_id,
-        user_mention=user_mention,
-        command=unfban_cmd,
-        task_filter=UNFBAN_REGEX,
+        targets=[(user_id, user_mention)],
         task_type="Un-FBan",
         reason=reason,
         progress=progress,
@@ -213,93 +390,431 @@ async def get_user_reason(message: Message, progress: Message) -> tuple[int, str
     return user_id, user_mention, reason
 
 
-async def perform_fed_task(*args, **kwargs):
-    async with FBAN_TASK_LOCK:
-        await _perform_fed_task(*args, **kwargs)
+async def bulk_fed_ban(message: Message, progress: Message):
+    targets, reason = await get_bulk_targets(message)
+    protected = {Config.OWNER_ID, *Config.SUPERUSERS, *Config.SUDO_USERS, *FED_BOT_IDS}
+    if bot.me:
+        protected.add(bot.me.id)
+    targets = [target for target in targets if target[0] not in protected]
+
+    if not targets:
+        await progress.edit("No users found to Fban.")
+        return
+
+    await progress.edit(f"❯ Fbanning <b>{len(targets)}</b> users...")
+
+    await perform_fed_task(
+        targets=targets, task_type="Fban", reason=reason, progress=progress, message=message
+    )
+
+
+async def get_bulk_targets(message: Message) -> tuple[list[tuple[int, str]], str]:
+    """Collect (user_id, mention) pairs and the reason for a bulk fban."""
+    reason: str = message.filtered_input
+    replied: Message | None = message.replied
 
+    if replied and replied.document:
+        file = await replied.download(in_memory=True)
+        tokens = file.getvalue().decode("utf-8", "ignore").split()
 
-async def _perform_fed_task(
-    user_id: int,
-    user_mention: str,
-    command: str,
-    task_filter: filters.Filter,
+    elif replied:
+        return await get_range_senders(message), reason
+
+    else:
+        # Leading ids/usernames are targets, whatever follows is the reason.
+        tokens = []
+        while reason:
+            head, *tail = reason.split(maxsplit=1)
+            if not BULK_TARGET_REGEX.fullmatch(head):
+                break
+            tokens.append(head)
+            reason = tail[0] if tail else ""
+
+    targets: dict[int, str] = {}
+
+    for token in tokens:
+        if not BULK_TARGET_REGEX.fullmatch(token):
+            continue
+
+        if token.isdigit():
+            user_id = int(token)
+            targets.setdefault(user_id, f"<a href='tg://user?id={user_id}'>{user_id}</a>")
+            continue
+
+        try:
+            user: User = await bot.get_users(token)
+            targets.setdefault(user.id, user.mention)
+        except Exception as e:
+            await bot.log_text(text=f"Bulk Fban: couldn't resolve {token}\nError: {e}", type="FBAN")
+
+    return list(targets.items()), reason
+
+
+async def get_range_senders(message: Message) -> list[tuple[int, str]]:
+    """
+    Senders of every message from the replied one up to the command.
+    Bots (fed bots, the group's moderation bot...), ourselves and chat admins are skipped.
+    """
+    first_id = max(message.replied.id, message.id - BULK_RANGE_LIMIT)
+    message_ids = list(range(first_id, message.id))
+    senders: dict[int, str] = {}
+
+    admin_ids: set[int] = set()
+    try:
+        async for member in bot.get_chat_members(
+            chat_id=message.chat.id, filter=ChatMembersFilter.ADMINISTRATORS
+        ):
+            admin_ids.add(member.user.id)
+    except Exception:
+        # Basic/private chats may not list admins, the other checks still apply.
+        pass
+
+    for i in range(0, len(message_ids), 200):
+        messages = await bot.get_messages(
+            chat_id=message.chat.id, message_ids=message_ids[i : i + 200]
+        )
+        for msg in messages:
+            user = msg.from_user
+            if msg.empty or not user or user.is_bot or user.is_self:
+                continue
+            if user.id in FED_BOT_IDS or user.id in admin_ids:
+                continue
+            senders.setdefault(msg.from_user.id, msg.from_user.mention)
+
+    return list(senders.items())
+
+
+async def perform_fed_task(
+    targets: list[tuple[int, str]],
     task_type: str,
     reason: str,
     progress: Message,
     message: Message,
 ):
-    await progress.edit("❯❯")
-
-    total: int = 0
-    failed: list[str] = []
+    """Store the task in FED_TASK_DB and hand it to the queue workers."""
+    feds: list[dict] = [fed async for fed in FED_DB.find()]
 
-    async for fed in FED_DB.find():
-        chat_id = int(fed["_id"])
-        total += 1
+    if not feds:
+        await progress.edit("You Don't have any feds connected!")
+        return
 
-        try:
-            cmd: Message = await bot.send_message(
-                chat_id=chat_id, text=command, disable_preview=True
+    trigger: str = FED_TASK_COMMANDS[task_type]
+
+    job_id = f"{message.chat.id}-{message.id}"
+    job = {
+        "_id": job_id,
+        "task_type": task_type,
+        "reason": reason,
+        "targets": [
+            dict(
+                user_id=user_id,
+                mention=mention,
+                command=f"{trigger} <a href='tg://user?id={user_id}'>{user_id}</a> {reason}",
             )
-            response: Message | None = await cmd.get_response(filters=task_filter, timeout=8)
-            if not response:
-                failed.append(fed["name"])
-            elif "Would you like to update this reason" in response.text:
-                await response.click("Update reason")
+            for user_id, mention in targets
+        ],
+        "pending": [[user_id, int(fed["_id"])] for user_id, _ in targets for fed in feds],
+        "failed": {},
+        "total": len(feds),
+        "chat_title": message.chat.title or "PM",
+        "by": "" if message.is_from_owner else get_name(message.from_user),
+        "nrc": "-nrc" in message.flags,
+        "serial": "-s" in message.flags,
+        "progress": [progress.chat.id, progress.id],
+    }
+    await FED_TASK_DB.add_data(job)
+
+    if len(targets) == 1:
+        await progress.edit("❯❯")
 
+    FED_TASK_PROGRESS[job_id] = progress
+    await FED_TASK_QUEUE.put(job_id)
+
+
+async def init_task():
+    """Start queue workers and resume jobs left unfinished by a restart."""
+    await FED_DB.load()
+
+    async for job in FED_TASK_DB.find():
+        FED_TASK_QUEUE.put_nowait(job["_id"])
+
+    for _ in range(FED_TASK_WORKERS):
+        FED_TASK_WORKER_TASKS.append(asyncio.create_task(fed_task_worker()))
+
+
+async def fed_task_worker():
+    while True:
+        job_id: str = await FED_TASK_QUEUE.get()
+        try:
+            await run_fed_job(job_id)
         except Exception as e:
-            await bot.log_text(
-                text=f"An Error occured while banning in fed: {fed['name']} [{chat_id}]"
-                f"\nError: {e}",
-                type=task_type.upper(),
-            )
-            failed.append(fed["name"])
-            continue
+            await bot.log_text(text=f"Fed task {job_id} crashed\nError: {e}", type="FBAN")
+        finally:
+            FED_TASK_QUEUE.task_done()
 
-        await asyncio.sleep(1)
 
-    if not total:
-        await progress.edit("You Don't have any feds connected!")
+async def run_fed_job(job_id: str):
+    job: dict | None = await FED_TASK_DB.find_one({"_id": job_id})
+    if not job:
         return
 
-    # Execution chat (summary only)
-    if failed:
-        exec_failed_str = f"\n<b>Failed in</b>: {len(failed)}/{total}"
-        log_failed_str = exec_failed_str + "\n• " + "\n• ".join(failed)
-    else:
-        exec_failed_str = f"\n<b>Status</b>: {task_type}ned in <b>{total}</b> feds."
-        log_failed_str = exec_failed_str
-
-    exec_resp = (
-        f"❯❯❯ <b>{task_type}ned</b> {user_mention}"
-        f"\n<b>ID</b>: {user_id}"
-        f"\n<b>Reason</b>: {reason}"
-        f"\n<b>Initiated in</b>: {message.chat.title or 'PM'}"
-        f"{exec_failed_str}"
-    )
+    outcomes = FED_TASK_OUTCOMES[job["task_type"]]
+    commands: dict[int, str] = {t["user_id"]: t["command"] for t in job["targets"]}
+    feds: dict[int, dict] = {int(fed["_id"]): fed async for fed in FED_DB.find()}
+
+    # -s: one fed at a time for this job, like the old serial behaviour.
+    job_semaphore = asyncio.Semaphore(1 if job["serial"] else len(job["pending"]) or 1)
+
+    loop = asyncio.get_running_loop()
+    is_bulk: bool = len(job["targets"]) > 1
+    total_pairs: int = len(job["targets"]) * job["total"]
+    done_pairs: int = total_pairs - len(job["pending"])
+    last_edit: float = 0
+
+    async def run_pair(user_id: int, fed_id: int):
+        nonlocal done_pairs, last_edit
+
+        fed = feds.get(fed_id)
+
+        if fed is None:
+            # Fed was removed from the list while the job was waiting.
+            outcome, name = None, str(fed_id)
+        else:
+            name = fed["name"]
+            # A fed chat only handles one command at a time so replies can't
+            # be mixed up, other jobs use that chat as soon as it is free.
+            async with job_semaphore, FED_CHAT_LOCKS[fed_id], FED_TASK_SEMAPHORE:
+                outcome = await fed_task_in_chat(
+                    fed=fed,
+                    command=commands[user_id],
+                    outcomes=outcomes,
+                    task_type=job["task_type"],
+                )
+
+        update = {"$pull": {"pending": [user_id, fed_id]}}
+        if outcome in (None, FedOutcome.NOT_ADMIN):
+            update["$push"] = {f"failed.{user_id}": name}
+        if outcome:
+            update["$inc"] = {f"outcomes.{outcome.name}": 1}
+        await FED_TASK_DB.update_one({"_id": job_id}, update)
+
+        done_pairs += 1
+        if is_bulk and loop.time() - last_edit > BULK_PROGRESS_INTERVAL:
+            last_edit = loop.time()
+            await edit_job_progress(
+                job=job,
+                text=f"❯❯ {job['task_type']}: <b>{done_pairs}/{total_pairs}</b> done"
+                f" for {len(job['targets'])} users.",
+                final=False,
+            )
 
-    log_resp = (
-        f"❯❯❯ <b>{task_type}ned</b> {user_mention}"
-        f"\n<b>ID</b>: {user_id}"
-        f"\n<b>Reason</b>: {reason}"
-        f"\n<b>Initiated in</b>: {message.chat.title or 'PM'}"
-        f"{log_failed_str}"
+    # Let every pair finish even if one fails, so none keep running unowned.
+    results = await asyncio.gather(
+        *(run_pair(user_id, fed_id) for user_id, fed_id in job["pending"]),
+        return_exceptions=True,
     )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        await bot.log_text(
+            text=f"Fed task {job_id}: {len(errors)} fed(s) errored\nError: {errors[0]}",
+            type="FBAN",
+        )
 
-    if not message.is_from_owner:
-        exec_resp += f"\n\n<b>By</b>: {get_name(message.from_user)}"
-        log_resp += f"\n\n<b>By</b>: {get_name(message.from_user)}"
+    await finish_fed_job(await FED_TASK_DB.find_one({"_id": job_id}))
 
-    # Full detail in log channel
-    await bot.send_message(
-        chat_id=extra_config.FBAN_LOG_CHANNEL, text=log_resp, disable_preview=True
+
+async def finish_fed_job(job: dict):
+    # Drop the job before any side effect, so a failure below can't make a
+    # restart re-post the logs or re-send the sudo fban.
+    await FED_TASK_DB.delete_data(id=job["_id"])
+
+    if len(job["targets"]) > 1:
+        await finish_bulk_fed_job(job)
+        return
+
+    task_type = job["task_type"]
+    total = job["total"]
+
+    for target in job["targets"]:
+        failed: list[str] = job["failed"].get(str(target["user_id"]), [])
+
+        # Execution chat (summary only)
+        if failed:
+            exec_failed_str = f"\n<b>Failed in</b>: {len(failed)}/{total}"
+            log_failed_str = exec_failed_str + "\n• " + "\n• ".join(failed)
+        else:
+            exec_failed_str = f"\n<b>Status</b>: {task_type}ned in <b>{total}</b> feds."
+            log_failed_str = exec_failed_str
+
+        exec_resp = (
+            f"❯❯❯ <b>{task_type}ned</b> {target['mention']}"
+            f"\n<b>ID</b>: {target['user_id']}"
+            f"\n<b>Reason</b>: {job['reason']}"
+            f"\n<b>Initiated in</b>: {job['chat_title']}"
+            f"{exec_failed_str}"
+        )
+
+        log_resp = (
+            f"❯❯❯ <b>{task_type}ned</b> {target['mention']}"
+            f"\n<b>ID</b>: {target['user_id']}"
+            f"\n<b>Reason</b>: {job['reason']}"
+            f"\n<b>Initiated in</b>: {job['chat_title']}"
+            f"{log_failed_str}"
+        )
+
+        if job.get("outcomes"):
+            log_resp += "\n<b>Replies</b>: " + ", ".join(
+                f"{FedOutcome[name].value}: {count}" for name, count in job["outcomes"].items()
+            )
+
+        if job["by"]:
+            exec_resp += f"\n\n<b>By</b>: {job['by']}"
+            log_resp += f"\n\n<b>By</b>: {job['by']}"
+
+        # Full detail in log channel
+        await bot.send_message(
+            chat_id=extra_config.FBAN_LOG_CHANNEL, text=log_resp, disable_preview=True
+        )
+
+        # Summary in execution chat
+        await edit_job_progress(job=job, text=exec_resp)
+
+        if not job["nrc"]:
+            await handle_sudo_fban(command=target["command"])
+
+
+async def finish_bulk_fed_job(job: dict):
+    """One consolidated log entry for every user in a bulk job."""
+    task_type = job["task_type"]
+    total = job["total"]
+    targets = job["targets"]
+
+    failed_users: int = 0
+    user_lines: list[str] = []
+
+    for target in targets:
+        failed: list[str] = job["failed"].get(str(target["user_id"]), [])
+        line = f"• {target['mention']} [<code>{target['user_id']}</code>]"
+        if failed:
+            failed_users += 1
+            line += f": failed in {len(failed)}/{total} ({', '.join(failed)})"
+        user_lines.append(line)
+
+    summary = (
+        f"❯❯❯ <b>Bulk {task_type}ned</b> {len(targets)} users in <b>{total}</b> feds"
+        f"\n<b>Reason</b>: {job['reason']}"
+        f"\n<b>Initiated in</b>: {job['chat_title']}"
+        f"\n<b>Users with failures</b>: {failed_users}/{len(targets)}"
     )
 
-    # Summary in execution chat
-    await progress.edit(text=exec_resp, del_in=5, block=True, disable_preview=True)
+    if job.get("outcomes"):
+        summary += "\n<b>Replies</b>: " + ", ".join(
+            f"{FedOutcome[name].value}: {count}" for name, count in job["outcomes"].items()
+        )
+
+    if job["by"]:
+        summary += f"\n\n<b>By</b>: {job['by']}"
+
+    log_resp = summary + "\n\n" + "\n".join(user_lines)
+
+    if len(log_resp) > 4096:
+        file = BytesIO(log_resp.encode())
+        file.name = f"bulk_{task_type.lower()}_{job['_id']}.txt"
+        await bot.send_document(
+            chat_id=extra_config.FBAN_LOG_CHANNEL, document=file, caption=summary
+        )
+    else:
+        await bot.send_message(
+            chat_id=extra_config.FBAN_LOG_CHANNEL, text=log_resp, disable_preview=True
+        )
+
+    await edit_job_progress(job=job, text=summary)
+
+    if not job["nrc"]:
+        for target in targets:
+            await handle_sudo_fban(command=target["command"])
+
+
+async def edit_job_progress(job: dict, text: str, final: bool = True):
+    if final:
+        progress: Message | None = FED_TASK_PROGRESS.pop(job["_id"], None)
+    else:
+        progress = FED_TASK_PROGRESS.get(job["_id"])
+
+    if progress:
+        # The progress message may have been deleted, that mustn't fail the job.
+        try:
+            if final:
+                await progress.edit(text=text, del_in=5, block=False, disable_preview=True)
+            else:
+                await progress.edit(text=text, disable_preview=True)
+        except Exception:
+            pass
+        return
+
+    # Job was resumed after a restart, only the message ids are left.
+    chat_id, message_id = job["progress"]
+    try:
+        await bot.edit_message_text(
+            chat_id=chat_id, message_id=message_id, text=text, disable_web_page_preview=True
+        )
+    except Exception:
+        pass
+
+
+async def fed_task_in_chat(
+    fed: dict, command: str, outcomes: set[FedOutcome], task_type: str
+) -> FedOutcome | None:
+    """
+    Send the fed command in a single fed chat and wait for the bot's reply.
+    Returns the reply's outcome, None if there was no usable reply.
+    """
+    chat_id = int(fed["_id"])
+    cmd: Message | None = None
+    waiter: asyncio.Future = FED_RESPONSES.expect(chat_id=chat_id, outcomes=outcomes)
+
+    try:
+        for attempt in range(FLOOD_RETRIES + 1):
+            await FED_LIMITER.acquire(chat_id)
+            try:
+                cmd: Message = await bot.send_message(
+                    chat_id=chat_id, text=command, disable_preview=True
+                )
+                break
+            except FloodWait as e:
+                FED_LIMITER.flood_wait(chat_id, e.value)
+                if attempt == FLOOD_RETRIES:
+                    raise
+
+        FED_RESPONSES.bind_reply(chat_id=chat_id, message_id=cmd.id)
+        result = await FED_RESPONSES.wait(
+            chat_id=chat_id, message_id=cmd.id, future=waiter, timeout=8
+        )
+        if not result:
+            return
+
+        response, outcome = result
+
+        FED_LIMITER.record_bot(chat_id, response.from_user.id)
+        FED_LIMITER.success(chat_id)
+
+        if outcome == FedOutcome.UPDATE_PROMPT:
+            await response.click("Update reason")
+
+    except Exception as e:
+        await bot.log_text(
+            text=f"An Error occured while banning in fed: {fed['name']} [{chat_id}]"
+            f"\nError: {e}",
+            type=task_type.upper(),
+        )
+        return
+
+    finally:
+        if cmd is None:
+            # Send failed, drop the waiter registered for it.
+            FED_RESPONSES.discard(chat_id=chat_id, future=waiter)
 
-    if "-nrc" not in message.flags:
-        await handle_sudo_fban(command=command)
+    return outcome
 
 
 async def handle_sudo_fban(command: str):
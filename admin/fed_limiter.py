@@ -0,0 +1,129 @@
+import asyncio
+
+from app import extra_config
+
+# Fed bots whose replies we wait for in fed chats.
+FED_BOT_IDS: list[int] = [609517172, 2059887769, 1376954911, 885745757]
+
+# Bucket config: rate is tokens per second, burst is the bucket size.
+CHAT_RATE: float = getattr(extra_config, "FBAN_CHAT_RATE", 0.5)
+CHAT_BURST: float = getattr(extra_config, "FBAN_CHAT_BURST", 2)
+BOT_RATE: float = getattr(extra_config, "FBAN_BOT_RATE", 4)
+BOT_BURST: float = getattr(extra_config, "FBAN_BOT_BURST", 8)
+
+
+class TokenBucket:
+    """
+    Async token bucket.
+    A FloodWait halves the rate and blocks the bucket for the wait,
+    every success after that creeps the rate back up to the configured one.
+    """
+
+    __slots__ = ("base_rate", "rate", "capacity", "tokens", "updated", "blocked_until", "lock")
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = asyncio.get_running_loop().time()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            while True:
+                now = loop.time()
+
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, wait: float):
+        now = asyncio.get_running_loop().time()
+        self.blocked_until = max(self.blocked_until, now + wait)
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+    def reward(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class FedRateLimiter:
+    """
+    Rate limits sends per fed chat and per fed bot.
+    The bot serving a chat is learnt from its replies,
+    so feds sharing a bot also share that bot's bucket.
+    """
+
+    def __init__(
+        self,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: float = CHAT_BURST,
+        bot_rate: float = BOT_RATE,
+        bot_burst: float = BOT_BURST,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.bot_rate = bot_rate
+        self.bot_burst = bot_burst
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.bot_buckets: dict[int, TokenBucket] = {}
+        self.chat_bots: dict[int, int] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _bot_bucket(self, chat_id: int) -> TokenBucket | None:
+        bot_id = self.chat_bots.get(chat_id)
+        if bot_id is None:
+            return None
+        bucket = self.bot_buckets.get(bot_id)
+        if bucket is None:
+            bucket = self.bot_buckets[bot_id] = TokenBucket(self.bot_rate, self.bot_burst)
+        return bucket
+
+    async def acquire(self, chat_id: int):
+        """Wait until both the chat and its bot allow another message."""
+        await self._chat_bucket(chat_id).acquire()
+        bot_bucket = self._bot_bucket(chat_id)
+        if bot_bucket:
+            await bot_bucket.acquire()
+
+    def record_bot(self, chat_id: int, bot_id: int):
+        if bot_id in FED_BOT_IDS:
+            self.chat_bots[chat_id] = bot_id
+
+    def success(self, chat_id: int):
+        self._chat_bucket(chat_id).reward()
+        bot_bucket = self._bot_bucket(chat_id)
+        if bot_bucket:
+            bot_bucket.reward()
+
+    def flood_wait(self, chat_id: int, wait: float):
+        self._chat_bucket(chat_id).penalize(wait)
+        bot_bucket = self._bot_bucket(chat_id)
+        if bot_bucket:
+            bot_bucket.penalize(wait)
+
+
+# Shared between fbans and reports so both respect the same buckets.
+FED_LIMITER = FedRateLimiter()
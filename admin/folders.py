@@ -1,28 +1,57 @@
-import asyncio
-from asyncio import sleep
-from pyrogram import raw, types, utils
-from pyrogram.enums import ChatType
+import re
+from pyrogram import raw, utils
+from pyrogram.errors import ChannelInvalid, ChannelPrivate, ChatIdInvalid, PeerIdInvalid
 from ub_core import BOT, Message, bot
-from app import CustomDB
 
-# Database collections
-ADM_CHAT_DB = CustomDB["adm_chat"]
-EXC_CHAT_DB = CustomDB["exc_chat"]
+from ..utils.cached_db import cached_collection
+from ..utils.dialog_snapshot import DIALOG_SNAPSHOT, is_raw_admin_group
+from ..utils.peer_cache import get_input_peer_id
 
-async def get_folder() -> raw.types.DialogFilter | int:
-    """Get existing Admin Chats folder or find available folder ID"""
+# Database collections, cached in memory and written through
+ADM_CHAT_DB = cached_collection("adm_chat")
+EXC_CHAT_DB = cached_collection("exc_chat")
+
+# Admin chats are split over "Admin Chats 1..N" folders of at most this many peers
+FOLDER_TITLE = "Admin Chats"
+SHARD_TITLE_REGEX = re.compile(rf"{FOLDER_TITLE} (\d+)")
+FOLDER_PEER_LIMIT = 100
+
+# Peers per channels.GetChannels / messages.GetChats call
+CHAT_LOOKUP_CHUNK = 100
+
+# Errors that definitely mean a peer is gone for us, anything else is not a reason to drop a chat
+DEAD_PEER_ERRORS = (ChannelInvalid, ChannelPrivate, ChatIdInvalid, PeerIdInvalid)
+
+async def init_task():
+    """Load cached collections once at startup"""
+    await ADM_CHAT_DB.load()
+    await EXC_CHAT_DB.load()
+
+def get_shard_number(title: str) -> int | None:
+    """Shard number from an "Admin Chats N" title, the old single "Admin Chats" folder is shard 1"""
+    if title == FOLDER_TITLE:
+        return 1
+    match = SHARD_TITLE_REGEX.fullmatch(title)
+    return int(match.group(1)) if match else None
+
+async def get_folders() -> tuple[dict[int, raw.types.DialogFilter], set[int]]:
+    """Get existing Admin Chats shard folders by shard number, and every folder ID in use"""
     dialog_filters: raw.types.messages.DialogFilters = await bot.invoke(
         raw.functions.messages.GetDialogFilters()
     )
+    shards = {}
     folder_ids = set()
     for filter in dialog_filters.filters:
         if not isinstance(filter, raw.types.DialogFilter | raw.types.DialogFilterChatlist):
             continue
-        if filter.title.text == "Admin Chats":
-            return filter
         folder_ids.add(filter.id)
+        shard = get_shard_number(filter.title.text)
+        if shard and isinstance(filter, raw.types.DialogFilter):
+            shards[shard] = filter
+    return shards, folder_ids
 
-    # Find available folder ID
+def get_free_folder_id(folder_ids: set[int]) -> int:
+    """Find available folder ID"""
     for i in range(2, 256):
         if i not in folder_ids:
             return i
@@ -35,11 +64,15 @@ async def update_folder(
     excluded_peers: list = None,
     pinned_peers: list = None,
     folder=None,
+    title: str = FOLDER_TITLE,
 ) -> bool:
-    """Update or create Admin Chats folder"""
+    """Update or create Admin Chats folder, an empty one is deleted instead"""
+    if folder is None and not (included_peers or pinned_peers):
+        return await bot.invoke(raw.functions.messages.UpdateDialogFilter(id=folder_id))
+
     filter = folder or raw.types.DialogFilter(
         id=folder_id,
-        title=raw.types.TextWithEntities(text="Admin Chats", entities=[]),
+        title=raw.types.TextWithEntities(text=title, entities=[]),
         pinned_peers=[] if pinned_peers is None else pinned_peers,
         include_peers=[] if included_peers is None else included_peers,
         exclude_peers=[] if excluded_peers is None else excluded_peers,
@@ -51,166 +84,297 @@ async def update_folder(
         )
     )
 
-async def get_dialogs():
-    """Get all dialogs/chats"""
-    current = 0
-    total = (1 << 31) - 1
-    request_limit = min(100, total)
-    offset_date = 0
-    offset_id = 0
-    offset_peer = raw.types.InputPeerEmpty()
-    seen_dialog_ids = set()
-
-    while True:
-        r = await bot.invoke(
-            raw.functions.messages.GetDialogs(
-                offset_date=offset_date,
-                offset_id=offset_id,
-                offset_peer=offset_peer,
-                limit=request_limit,
-                hash=0,
-                exclude_pinned=False,
-                folder_id=0,
-            ),
-            sleep_threshold=60,
-        )
+class FolderPeers:
+    """Ordered folder peer list keyed by chat id, for O(1) add/remove/contains"""
+
+    __slots__ = ("peers",)
+
+    def __init__(self, peers: list | None = None):
+        self.peers: dict[int, raw.base.InputPeer] = {
+            get_input_peer_id(peer): peer for peer in peers or []
+        }
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self.peers
+
+    def __iter__(self):
+        return iter(list(self.peers))
+
+    def __len__(self) -> int:
+        return len(self.peers)
+
+    def add(self, chat_id: int, peer: raw.base.InputPeer) -> bool:
+        if chat_id in self.peers:
+            return False
+        self.peers[chat_id] = peer
+        return True
+
+    def remove(self, chat_id: int) -> raw.base.InputPeer | None:
+        return self.peers.pop(chat_id, None)
+
+    def to_list(self) -> list:
+        return list(self.peers.values())
+
+class AdminFolder:
+    """One Admin Chats shard folder with its peer lists indexed by chat id"""
+
+    def __init__(
+        self, folder_id: int, shard: int, dialog_filter: raw.types.DialogFilter | None = None
+    ):
+        self.id = folder_id
+        self.shard = shard
+        self.dialog_filter = dialog_filter
+        self.include = FolderPeers(dialog_filter.include_peers if dialog_filter else None)
+        self.exclude = FolderPeers(dialog_filter.exclude_peers if dialog_filter else None)
+        self.pinned = FolderPeers(dialog_filter.pinned_peers if dialog_filter else None)
+        self.dirty = False
+
+    @property
+    def title(self) -> str:
+        return f"{FOLDER_TITLE} {self.shard}"
+
+    @property
+    def exists(self) -> bool:
+        return self.dialog_filter is not None
+
+    @property
+    def free_slots(self) -> int:
+        # Pinned peers count towards the folder's peer cap too
+        return FOLDER_PEER_LIMIT - len(self.include) - len(self.pinned)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self.include or chat_id in self.exclude or chat_id in self.pinned
+
+    async def save(self) -> bool:
+        """Turn the index back into the ordered lists a DialogFilter wants and update it"""
+        if self.dialog_filter is None or not (self.include or self.pinned):
+            return await update_folder(
+                self.id,
+                self.include.to_list(),
+                self.exclude.to_list(),
+                self.pinned.to_list(),
+                title=self.title,
+            )
+        self.dialog_filter.title = raw.types.TextWithEntities(text=self.title, entities=[])
+        self.dialog_filter.include_peers = self.include.to_list()
+        self.dialog_filter.exclude_peers = self.exclude.to_list()
+        self.dialog_filter.pinned_peers = self.pinned.to_list()
+        return await update_folder(folder_id=self.id, folder=self.dialog_filter)
+
+class AdminFolders:
+    """
+    Admin chats sharded over "Admin Chats 1..N" folders to stay under the per-folder peer cap.
+    Chats stay in the shard they were put in, new ones go to the emptiest shard with room,
+    and only shards that changed are written back.
+    """
 
-        users = {i.id: i for i in r.users}
-        chats = {i.id: i for i in r.chats}
-        messages = {}
+    def __init__(self, shards: dict[int, AdminFolder], folder_ids: set[int]):
+        self.shards = shards
+        self.folder_ids = folder_ids
+
+    @classmethod
+    async def load(cls) -> "AdminFolders":
+        filters, folder_ids = await get_folders()
+        shards = {
+            shard: AdminFolder(folder.id, shard, folder) for shard, folder in filters.items()
+        }
+        return cls(shards, folder_ids)
+
+    @property
+    def exists(self) -> bool:
+        return any(folder.exists for folder in self.shards.values())
+
+    def __contains__(self, chat_id: int) -> bool:
+        return any(chat_id in folder for folder in self.shards.values())
+
+    def __len__(self) -> int:
+        return sum(len(folder.include) for folder in self.shards.values())
+
+    def included(self) -> list:
+        return [peer for folder in self.shards.values() for peer in folder.include.to_list()]
+
+    def shard_of(self, chat_id: int) -> int | None:
+        for shard, folder in self.shards.items():
+            if chat_id in folder:
+                return shard
+
+    def _new_shard(self) -> AdminFolder:
+        shard = next(i for i in range(1, len(self.shards) + 2) if i not in self.shards)
+        folder_id = get_free_folder_id(self.folder_ids)
+        self.folder_ids.add(folder_id)
+        folder = self.shards[shard] = AdminFolder(folder_id, shard)
+        return folder
+
+    def add(self, chat_id: int, peer: raw.base.InputPeer, preferred: int | None = None) -> int:
+        """Add an included chat, returns the shard it went to"""
+        folder = self.shards.get(preferred)
+        if folder is None or folder.free_slots <= 0:
+            open_shards = [f for f in self.shards.values() if f.free_slots > 0]
+            folder = max(open_shards, key=lambda f: f.free_slots, default=None) or self._new_shard()
+
+        if folder.include.add(chat_id, peer):
+            folder.dirty = True
+        return folder.shard
+
+    def remove(self, chat_id: int) -> bool:
+        for folder in self.shards.values():
+            if folder.include.remove(chat_id):
+                folder.dirty = True
+                return True
+        return False
+
+    async def save(self) -> bool:
+        """Write back only the shards that changed"""
+        success = True
+        for folder in self.shards.values():
+            if folder.dirty:
+                success = bool(await folder.save()) and success
+                folder.dirty = False
+        return success
+
+async def fetch_raw_chats(peers: list) -> tuple[list, list[int]]:
+    """
+    Fetch raw chats for InputPeerChannel/InputPeerChat peers of one kind in a single call.
+    Returns the chats and the ids of peers the API definitely rejected,
+    any other error (FloodWait, network, timeouts) is raised.
+    """
+    try:
+        if isinstance(peers[0], raw.types.InputPeerChannel):
+            r = await bot.invoke(
+                raw.functions.channels.GetChannels(
+                    id=[
+                        raw.types.InputChannel(channel_id=p.channel_id, access_hash=p.access_hash)
+                        for p in peers
+                    ]
+                ),
+                sleep_threshold=60,
+            )
+        else:
+            r = await bot.invoke(
+                raw.functions.messages.GetChats(id=[p.chat_id for p in peers]),
+                sleep_threshold=60,
+            )
+        return r.chats, []
+    except DEAD_PEER_ERRORS:
+        if len(peers) == 1:
+            return [], [get_input_peer_id(peers[0])]
+        # One bad peer fails the whole request, split it to find that peer
+        mid = len(peers) // 2
+        left_chats, left_dead = await fetch_raw_chats(peers[:mid])
+        right_chats, right_dead = await fetch_raw_chats(peers[mid:])
+        return [*left_chats, *right_chats], [*left_dead, *right_dead]
+
+async def get_admin_status(peers: list) -> dict[int, bool | None]:
+    """
+    Check admin rights for many folder peers using batched raw lookups.
+    Returns chat id -> admin in that group, False for chats that are definitely gone
+    and None if the API didn't return the chat.
+    """
+    status = {get_input_peer_id(peer): None for peer in peers}
 
-        for message in r.messages:
-            if isinstance(message, raw.types.MessageEmpty):
-                continue
-            chat_id = utils.get_peer_id(message.peer_id)
-            messages[chat_id] = message
+    for peer_type in (raw.types.InputPeerChannel, raw.types.InputPeerChat):
+        typed_peers = [peer for peer in peers if isinstance(peer, peer_type)]
 
-        dialogs = []
-        for dialog in r.dialogs:
-            if not isinstance(dialog, raw.types.Dialog):
-                continue
-            parsed = types.Dialog._parse(bot, dialog, messages, users, chats)
-            if parsed is None:
-                continue
-            if parsed.chat is None:
-                continue
-            if parsed.chat.id in seen_dialog_ids:
-                continue
-            seen_dialog_ids.add(parsed.chat.id)
-            dialogs.append(parsed)
+        for i in range(0, len(typed_peers), CHAT_LOOKUP_CHUNK):
+            chats, dead_ids = await fetch_raw_chats(typed_peers[i : i + CHAT_LOOKUP_CHUNK])
+            for chat_id in dead_ids:
+                status[chat_id] = False
+            for chat in chats:
+                if isinstance(chat, raw.types.Channel | raw.types.ChannelForbidden):
+                    chat_id = utils.get_channel_id(chat.id)
+                else:
+                    chat_id = -chat.id
+                status[chat_id] = is_raw_admin_group(chat)
 
-        if not dialogs:
-            return
-
-        last = dialogs[-1]
-        if last.top_message is None:
-            return
+    return status
 
-        offset_id = last.top_message.id
-        offset_date = last.top_message.date
-        offset_peer = await bot.resolve_peer(last.chat.id)
-
-        for dialog in dialogs:
-            await sleep(0)
-            yield dialog
-            current += 1
-            if current >= total:
-                return
-
-async def is_admin_group(chat) -> bool:
-    """Check if chat is a group where user has admin privileges"""
-    return (
-        chat.admin_privileges and
-        chat.type in [ChatType.GROUP, ChatType.SUPERGROUP] and
-        not chat.type == ChatType.CHANNEL
+async def confirm_admin_groups(dialogs: list) -> list:
+    """
+    Re-check snapshot admin groups with the API before they go into a folder.
+    The snapshot can lag (left chats, rights changed in a quiet chat),
+    so only the confirmed ones are returned, and the rest are marked in the snapshot.
+    """
+    status = await get_admin_status([dialog.input_peer for dialog in dialogs])
+    await DIALOG_SNAPSHOT.mark_not_admin(
+        [chat_id for chat_id, is_admin in status.items() if is_admin is False]
     )
+    return [dialog for dialog in dialogs if status.get(dialog.id)]
 
 async def get_excluded_chats() -> set:
     """Get all excluded chat IDs from database"""
-    excluded_chats = set()
-    async for exc_chat in EXC_CHAT_DB.find():
-        excluded_chats.add(exc_chat["_id"])
-    return excluded_chats
+    return await EXC_CHAT_DB.ids()
 
 @bot.add_cmd(cmd="folder")
 async def create_admin_folder(bot: BOT, message: Message):
     """
     CMD: FOLDER
-    INFO: Creates/updates Admin Chats folder with admin groups
-    USAGE: .folder
+    INFO:
+        Creates/updates Admin Chats folders with admin groups,
+        split over "Admin Chats 1..N" once a folder hits the peer cap
+    FLAGS: -full to rescan every dialog instead of only the ones with new activity
+    USAGE: .folder | .folder -full
     """
     resp = await message.reply("`Creating Admin Chats folder...`")
 
     try:
-        folder = await get_folder()
-        included_peers = []
-        excluded_peers = []
-        pinned_peers = []
-
-        if isinstance(folder, raw.types.DialogFilter):
-            included_peers.extend(folder.include_peers)
-            excluded_peers.extend(folder.exclude_peers)
-            pinned_peers.extend(folder.pinned_peers)
-            folder_id = folder.id
-        else:
-            folder_id = folder
+        folders = await AdminFolders.load()
 
         # Get excluded chats from database
         excluded_chat_ids = await get_excluded_chats()
 
-        # Clear existing admin chats from database
-        await ADM_CHAT_DB.drop()
-
-        existing_hashes = {x.access_hash for x in [*included_peers, *excluded_peers, *pinned_peers]}
+        # Admin chats found in this scan, written to the DB in one go at the end
+        admin_chats: dict[int, dict] = {}
 
         await resp.edit("`Scanning for admin groups...`")
 
         new_added = 0
         total_admin_groups = 0
 
-        async for d in get_dialogs():
-            # Skip if not an admin group
-            if not await is_admin_group(d.chat):
+        snapshot = await DIALOG_SNAPSHOT.get(refresh=True, full="-full" in message.flags)
+
+        # Chats not in a folder yet are confirmed with the API before being added
+        candidates = snapshot.admin_groups()
+        new_dialogs = [d for d in candidates if folders.shard_of(d.id) is None]
+        confirmed_ids = {d.id for d in await confirm_admin_groups(new_dialogs)}
+
+        for dialog in candidates:
+            chat_id = dialog.id
+            shard = folders.shard_of(chat_id)
+            if shard is None and chat_id not in confirmed_ids:
                 continue
 
             total_admin_groups += 1
 
             # Skip if chat is excluded
-            if d.chat.id in excluded_chat_ids:
-                continue
-
-            # Skip if already in folder
-            if d.chat._raw.access_hash in existing_hashes:
-                # Add to database anyway for tracking
-                await ADM_CHAT_DB.add_data({
-                    "_id": d.chat.id,
-                    "name": d.chat.title,
-                    "type": str(d.chat.type)
-                })
+            if chat_id in excluded_chat_ids:
                 continue
 
-            # Add to folder and database
-            peer = await bot.resolve_peer(d.chat.id)
-            included_peers.append(peer)
+            # Skip if already in a folder, otherwise add to its old shard if there's room
+            if shard is None:
+                stored = await ADM_CHAT_DB.find_one({"_id": chat_id}) or {}
+                shard = folders.add(chat_id, dialog.input_peer, preferred=stored.get("shard"))
+                new_added += 1
 
-            await ADM_CHAT_DB.add_data({
-                "_id": d.chat.id,
-                "name": d.chat.title,
-                "type": str(d.chat.type)
-            })
+            admin_chats[chat_id] = {
+                "_id": chat_id,
+                "name": dialog.title,
+                "type": str(dialog.type),
+                "shard": shard,
+            }
 
-            new_added += 1
+        # Only changed/removed admin chats hit the DB
+        await ADM_CHAT_DB.sync_data(admin_chats)
 
-        # Update folder
-        success = await update_folder(folder_id, included_peers, excluded_peers, pinned_peers)
+        # Update changed folders
+        success = await folders.save()
 
         excluded_count = len(excluded_chat_ids)
-        total_in_folder = len(included_peers)
+        total_in_folder = len(folders)
 
         resp_text = (
             f"📁 <b>Admin Chats Folder {'Updated' if success else 'Failed'}</b>\n\n"
             f"<b>Total Admin Groups:</b> {total_admin_groups}\n"
-            f"<b>In Folder:</b> {total_in_folder}\n"
+            f"<b>In Folder:</b> {total_in_folder} ({len(folders.shards)} folders)\n"
             f"<b>Excluded:</b> {excluded_count}\n"
             f"<b>New Added:</b> {new_added}"
         )
@@ -243,18 +407,10 @@ async def exclude_chat(bot: BOT, message: Message):
         # Remove from admin chats database if exists
         await ADM_CHAT_DB.delete_data(id=chat_id)
 
-        # Get current folder and remove this chat
-        folder = await get_folder()
-        if isinstance(folder, raw.types.DialogFilter):
-            # Remove from included peers
-            current_peer = await bot.resolve_peer(chat_id)
-            folder.include_peers = [
-                peer for peer in folder.include_peers
-                if peer.access_hash != current_peer.access_hash
-            ]
-
-            # Update folder
-            await update_folder(folder_id=folder.id, folder=folder)
+        # Get current folders and remove this chat, update only the one it was in
+        folders = await AdminFolders.load()
+        if folders.remove(chat_id):
+            await folders.save()
 
         # Log the action (no reply to keep it silent)
         log_text = f"🚫 Excluded chat: {chat_title} ({chat_id}) from Admin Chats folder"
@@ -269,13 +425,14 @@ async def reload_admin_folder(bot: BOT, message: Message):
     """
     CMD: RELOAD
     INFO: Refresh Admin Chats folder - add new admin groups, remove non-admin groups
-    USAGE: .reload
+    FLAGS: -full to rescan every dialog instead of only the ones with new activity
+    USAGE: .reload | .reload -full
     """
     resp = await message.reply("`Reloading Admin Chats folder...`")
 
     try:
-        folder = await get_folder()
-        if not isinstance(folder, raw.types.DialogFilter):
+        folders = await AdminFolders.load()
+        if not folders.exists:
             await resp.edit("❌ Admin Chats folder not found. Use .folder to create it first.")
             return
 
@@ -284,60 +441,67 @@ async def reload_admin_folder(bot: BOT, message: Message):
         # Get excluded chats
         excluded_chat_ids = await get_excluded_chats()
 
-        # Check current chats in folder for admin status
-        to_remove = []
-        current_peers = folder.include_peers.copy()
-
-        for peer in current_peers:
-            try:
-                # Get chat info
-                chat_info = await bot.get_chat(peer.channel_id if hasattr(peer, 'channel_id') else peer.user_id)
+        # Check current chats in folder for admin status, in batches
+        admin_status = await get_admin_status(folders.included())
 
-                # Remove if no longer admin or is excluded
-                if not await is_admin_group(chat_info) or chat_info.id in excluded_chat_ids:
-                    to_remove.append(peer)
-                    await ADM_CHAT_DB.delete_data(id=chat_info.id)
-            except:
-                # If can't get chat info, remove it
-                to_remove.append(peer)
+        # Remove only on a definite answer: no longer admin / chat gone, or excluded.
+        # Chats the API didn't return (None) stay until a later reload can tell.
+        not_admin = [chat_id for chat_id, is_admin in admin_status.items() if is_admin is False]
+        to_remove = [
+            chat_id
+            for chat_id, is_admin in admin_status.items()
+            if is_admin is False or chat_id in excluded_chat_ids
+        ]
 
         # Remove non-admin chats from folder
-        for peer in to_remove:
-            folder.include_peers.remove(peer)
+        for chat_id in to_remove:
+            folders.remove(chat_id)
+
+        # Keep the snapshot from re-adding them on this incremental scan
+        await DIALOG_SNAPSHOT.mark_not_admin(not_admin)
 
         await resp.edit("`Scanning for new admin groups...`")
 
         # Find new admin groups
-        existing_hashes = {x.access_hash for x in folder.include_peers}
         new_added = 0
+        new_admin_chats: list[dict] = []
 
-        async for d in get_dialogs():
-            if not await is_admin_group(d.chat):
-                continue
+        snapshot = await DIALOG_SNAPSHOT.get(refresh=True, full="-full" in message.flags)
 
-            if d.chat.id in excluded_chat_ids:
-                continue
+        new_dialogs = [
+            dialog
+            for dialog in snapshot.admin_groups()
+            if dialog.id not in excluded_chat_ids and dialog.id not in folders
+        ]
 
-            if d.chat._raw.access_hash not in existing_hashes:
-                peer = await bot.resolve_peer(d.chat.id)
-                folder.include_peers.append(peer)
+        # Confirm with the API before adding, the snapshot can lag behind
+        for dialog in await confirm_admin_groups(new_dialogs):
+            chat_id = dialog.id
 
-                await ADM_CHAT_DB.add_data({
-                    "_id": d.chat.id,
-                    "name": d.chat.title,
-                    "type": str(d.chat.type)
+            if chat_id not in folders:
+                stored = await ADM_CHAT_DB.find_one({"_id": chat_id}) or {}
+                shard = folders.add(chat_id, dialog.input_peer, preferred=stored.get("shard"))
+
+                new_admin_chats.append({
+                    "_id": chat_id,
+                    "name": dialog.title,
+                    "type": str(dialog.type),
+                    "shard": shard,
                 })
 
                 new_added += 1
 
-        # Update folder
-        success = await update_folder(folder_id=folder.id, folder=folder)
+        # Apply removals and additions to the DB in one bulk write
+        await ADM_CHAT_DB.bulk_update(upserts=new_admin_chats, delete_ids=to_remove)
+
+        # Update changed folders
+        success = await folders.save()
 
         resp_text = (
             f"🔄 <b>Admin Chats Folder {'Reloaded' if success else 'Failed'}</b>\n\n"
             f"<b>Removed:</b> {len(to_remove)} (no longer admin/excluded)\n"
             f"<b>Added:</b> {new_added} (new admin groups)\n"
-            f"<b>Total in Folder:</b> {len(folder.include_peers)}\n"
+            f"<b>Total in Folder:</b> {len(folders)} ({len(folders.shards)} folders)\n"
             f"<b>Excluded:</b> {len(excluded_chat_ids)}"
         )
 
@@ -362,9 +526,9 @@ async def admin_status(bot: BOT, message: Message):
         excluded_count = await EXC_CHAT_DB.count_documents({})
 
         # Get folder info
-        folder = await get_folder()
-        folder_status = "Found" if isinstance(folder, raw.types.DialogFilter) else "Not Found"
-        folder_count = len(folder.include_peers) if isinstance(folder, raw.types.DialogFilter) else 0
+        folders = await AdminFolders.load()
+        folder_status = f"{len(folders.shards)} Found" if folders.exists else "Not Found"
+        folder_count = len(folders)
 
         status_text = (
             f"📊 <b>Admin Folder Status</b>\n\n"
@@ -2,12 +2,16 @@ import asyncio
 
 from pyrogram import filters
 from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait
 from pyrogram.types import User
 from ub_core.utils.helpers import get_name
 
-from app import BOT, Config, CustomDB, extra_config, Message, bot
+from app import BOT, Config, extra_config, Message, bot
 
-FED_DB = CustomDB("FED_LIST")
+from ..utils.cached_db import cached_collection
+from .fed_limiter import FED_LIMITER
+
+FED_DB = cached_collection("FED_LIST")
 
 # Global lock for federation tasks
 FBAN_TASK_LOCK = asyncio.Lock()
@@ -110,13 +114,27 @@ async def perform_fed_task(
             total += 1
 
             try:
-                cmd = await bot.send_message(
-                    chat_id=chat_id, text=command, disable_web_page_preview=True
-                )
+                # Paced per fed chat / fed bot instead of a fixed sleep
+                await FED_LIMITER.acquire(chat_id)
+                try:
+                    cmd = await bot.send_message(
+                        chat_id=chat_id, text=command, disable_web_page_preview=True
+                    )
+                except FloodWait as e:
+                    FED_LIMITER.flood_wait(chat_id, e.value)
+                    await FED_LIMITER.acquire(chat_id)
+                    cmd = await bot.send_message(
+                        chat_id=chat_id, text=command, disable_web_page_preview=True
+                    )
                 response = await cmd.get_response(filters=task_filter, timeout=8)
                 if not response:
                     failed.append(fed["name"])
-                elif "Would you like to update this reason" in response.text:
+                    continue
+
+                FED_LIMITER.record_bot(chat_id, response.from_user.id)
+                FED_LIMITER.success(chat_id)
+
+                if "Would you like to update this reason" in response.text:
                     await response.click("Update reason")
             except Exception as e:
                 await bot.log_text(
@@ -126,8 +144,6 @@ async def perform_fed_task(
                 failed.append(fed["name"])
                 continue
 
-            await asyncio.sleep(1)
-
         if total == 0:
             return  # No federations connected
 
@@ -2,108 +2,828 @@ import aiohttp
 import asyncio
 import json
 import random
-from datetime import datetime, timedelta
+import re
+import time
+from array import array
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from hashlib import blake2b
+from datetime import date as Date, datetime, timedelta
+from pyrogram import raw
 from pyrogram.enums import ParseMode  # Corrected import
+from pyrogram.errors import BadRequest, FloodWait
 
-from app import BOT, bot, Message
+from app import BOT, CustomDB, bot, extra_config, Message
+
+from ..utils.cached_db import cached_collection
+from ..utils.peer_cache import PEER_CACHE
 
 # ✅ CONFIG SECTION
+# Channels live in QUOTE_CHANNELS (.qchannel), this one is added on first start
 YOUR_CHANNEL_ID = -1002665845048   # Replace with your target channel ID
 YOUR_USERNAME = "TheQuotesFeed"         # Without @
-CACHE_CHAT_ID = -1002852357421     # Chat ID of the cache message
-CACHE_MSG_ID = 4                   # Message ID of the cache
-ZEN_QUOTES_API = "https://zenquotes.io/api/random"
-REQUEST_COOLDOWN = 32  # Cooldown between requests (seconds)
+CACHE_CHAT_ID = -1002852357421     # Old JSON cache message, imported once into SCHEDULE_DB
+CACHE_MSG_ID = 4                   # Message ID of the old cache
+ZEN_QUOTES_API = "https://zenquotes.io/api"  # Base URL, point it at a stub server to test
+REQUEST_COOLDOWN = 32  # Cooldown between API requests (seconds)
+POOL_LOW_WATER = 50    # Refill the local pool in the background below this many quotes
+QUOTES_PER_BATCH = 50  # Quotes the batch endpoint returns per call
+SEND_CONCURRENCY = 4   # Scheduled sends in flight at once
+SEND_RETRIES = 3       # Attempts per date before giving up on it (FloodWaits don't count)
 
+# Background auto-fill: keep this many days ahead of today scheduled, 0 (default) turns it off
+QUOTES_DAYS_AHEAD: int = getattr(extra_config, "QUOTES_DAYS_AHEAD", 0)
+AUTOFILL_INTERVAL: int = getattr(extra_config, "QUOTES_AUTOFILL_INTERVAL", 6 * 60 * 60)
+AUTOFILL_CHUNK = 10    # Dates scheduled per auto-fill step
+AUTOFILL_PAUSE = 30    # Seconds between auto-fill steps, so manual runs get the lock
 
-@bot.add_cmd(cmd="quotes")
-async def schedule_quotes(bot: BOT, message: Message):
-    args = message.text.strip().split()
-    if len(args) != 2 or not args[1].isdigit():
-        return await message.reply("Usage: .quotes <number_of_quotes>")
+# Quotes fetched but not scheduled yet
+QUOTE_POOL_DB = CustomDB["quote_pool"]
+# Scheduled dates, one doc per run of consecutive days: {channel, start, end} as date ordinals
+SCHEDULE_DB = CustomDB["quote_schedule"]
+# Target channels: {_id: chat id, username, template, days_ahead}
+QUOTE_CHANNELS = cached_collection("quote_channels")
 
-    count = int(args[1])
-    await message.reply(f"Scheduling {count} quotes...")
+DEFAULT_TEMPLATE = (
+    "<b>Quote of the day:</b>\n\n"
+    "<b>{quote}</b>\n"
+    "by <i>{author}</i>\n\n"
+    "<i>Follow @{username} for more!</i>"
+)
+# 64-bit hashes of every quote ever accepted into the pool: {_id: hash}
+QUOTE_HASH_DB = CustomDB["quote_hashes"]
+# One-time migration flags: {_id: flag name}
+QUOTES_META_DB = CustomDB["quotes_meta"]
 
-    # Step 1: Load existing scheduled dates
-    cache_msg = await bot.get_messages(chat_id=CACHE_CHAT_ID, message_ids=CACHE_MSG_ID)
-    try:
-        existing_dates = json.loads(cache_msg.text)
-    except Exception as e:
-        return await message.reply(f"❌ Failed to parse cache: {e}")
 
-    existing_dates = [datetime.strptime(d, "%Y-%m-%d").date() for d in existing_dates if d.strip()]
-    existing_dates_set = set(existing_dates)
+class QuoteIndex:
+    """
+    Sorted array of signed 64-bit hashes of normalized quote + author.
+    8 bytes a quote, so tens of thousands of quotes stay well under a MB,
+    and lookups are a bisect.
+    """
+
+    _strip = re.compile(r"[^\w\s]")
+    _spaces = re.compile(r"\s+")
+
+    def __init__(self, db=QUOTE_HASH_DB):
+        self.db = db
+        self.hashes = array("q")
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @classmethod
+    def hash_quote(cls, quote: dict) -> int:
+        normalized = "\x00".join(
+            cls._spaces.sub(" ", cls._strip.sub("", quote[key].casefold())).strip()
+            for key in ("q", "a")
+        )
+        digest = blake2b(normalized.encode(), digest_size=8).digest()
+        # Signed, so it fits in a Mongo int64
+        return int.from_bytes(digest, "big", signed=True)
+
+    def _contains(self, quote_hash: int) -> bool:
+        idx = bisect_left(self.hashes, quote_hash)
+        return idx < len(self.hashes) and self.hashes[idx] == quote_hash
+
+    async def load(self):
+        async with self._lock:
+            if self.loaded:
+                return
+            self.hashes = array("q", sorted([doc["_id"] async for doc in self.db.find()]))
+            self.loaded = True
+
+    async def filter_new(self, quotes: list[dict]) -> list[dict]:
+        """The quotes not seen before, without duplicates among themselves"""
+        await self.load()
+        fresh: dict[int, dict] = {}
+        for quote in quotes:
+            quote_hash = self.hash_quote(quote)
+            if quote_hash not in fresh and not self._contains(quote_hash):
+                fresh[quote_hash] = quote
+        return list(fresh.values())
+
+    async def add(self, quotes: list[dict]):
+        """Index quotes, once they are safely stored elsewhere"""
+        await self.load()
+        async with self._lock:
+            new_hashes = {self.hash_quote(quote) for quote in quotes}
+            new_hashes = [quote_hash for quote_hash in new_hashes if not self._contains(quote_hash)]
+            if not new_hashes:
+                return
+
+            await self.db.insert_many([{"_id": quote_hash} for quote_hash in new_hashes])
+            for quote_hash in new_hashes:
+                self.hashes.insert(bisect_left(self.hashes, quote_hash), quote_hash)
+
 
-    # Step 2: Determine next available dates
-    if existing_dates:
-        start_date = max(existing_dates) + timedelta(days=1)
-    else:
-        start_date = datetime.now().date() + timedelta(days=1)
+QUOTE_INDEX = QuoteIndex()
 
-    new_dates = []
-    current_date = start_date
 
-    while len(new_dates) < count:
-        if current_date not in existing_dates_set:
-            new_dates.append(current_date)
-        current_date += timedelta(days=1)
+class QuoteProvider:
+    """
+    Hands out quotes from a local pool kept in QUOTE_POOL_DB.
+    The pool is filled 50 at a time from the batch endpoint over one pooled
+    session, and topped up in the background once it runs low.
+    """
 
-    scheduled_dates = []
+    def __init__(
+        self,
+        base_url: str = ZEN_QUOTES_API,
+        pool=QUOTE_POOL_DB,
+        index: QuoteIndex = QUOTE_INDEX,
+        cooldown: float = REQUEST_COOLDOWN,
+        low_water: int = POOL_LOW_WATER,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool = pool
+        self.index = index
+        self.cooldown = cooldown
+        self.low_water = low_water
+        self._session: aiohttp.ClientSession | None = None
+        self._last_request = 0.0
+        self._refill_lock = asyncio.Lock()
+        self._take_lock = asyncio.Lock()
+        self._refill_task: asyncio.Task | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    async def fetch_batch(self) -> list[dict]:
+        """One call to the batch endpoint, spaced out by the API cooldown"""
+        wait = self._last_request + self.cooldown - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
 
-    # Step 3: Fetch and schedule quotes
-    for date in new_dates:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(ZEN_QUOTES_API) as resp:
-                    quote_data = await resp.json()
-                    await asyncio.sleep(REQUEST_COOLDOWN)  # Apply cooldown between requests
-
-            quote = quote_data[0]["q"]
-            author = quote_data[0]["a"]
-
-            text = (
-                f"<b>Quote of the day:</b>\n\n"
-                f"<b>{quote}</b>\n"
-                f"by <i>{author}</i>\n\n"
-                f"<i>Follow @{YOUR_USERNAME} for more!</i>"
+            async with self.session.get(f"{self.base_url}/quotes") as resp:
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+        finally:
+            self._last_request = time.monotonic()
+
+        # Rate-limit notices come back as a "quote" by zenquotes.io
+        return [
+            {"q": item["q"], "a": item["a"]}
+            for item in data
+            if item.get("q") and item.get("a") != "zenquotes.io"
+        ]
+
+    async def refill(self) -> int:
+        """Fetch a batch and pool the quotes that were never pooled before"""
+        async with self._refill_lock:
+            quotes = await self.index.filter_new(await self.fetch_batch())
+            if quotes:
+                now = time.time()
+                await self.pool.insert_many([{**quote, "added": now} for quote in quotes])
+                # Only now, a failed insert must not mark the quotes as seen
+                await self.index.add(quotes)
+            return len(quotes)
+
+    def refill_in_background(self):
+        if self._refill_task and not self._refill_task.done():
+            return
+
+        async def top_up():
+            try:
+                if await self.pool.count_documents({}) < self.low_water:
+                    await self.refill()
+            except Exception as e:
+                await bot.log_text(text=f"Quote pool refill failed: {e}", type="error")
+
+        self._refill_task = asyncio.create_task(top_up())
+
+    async def take(self, count: int) -> list[dict]:
+        """Take count quotes out of the pool, fetching more while it is short"""
+        quotes: list[dict] = []
+        empty_batches = 0
+
+        async with self._take_lock:
+            try:
+                while len(quotes) < count:
+                    docs = [
+                        doc
+                        async for doc in self.pool.find()
+                        .sort("added", 1)
+                        .limit(count - len(quotes))
+                    ]
+                    if docs:
+                        await self.pool.delete_many(
+                            {"_id": {"$in": [doc["_id"] for doc in docs]}}
+                        )
+                        quotes.extend(docs)
+                        continue
+
+                    if await self.refill():
+                        empty_batches = 0
+                        continue
+
+                    empty_batches += 1
+                    if empty_batches >= 3:
+                        raise ValueError("Quote API returned no new quotes.")
+            except BaseException:
+                # Already indexed, so dropping them here would lose them for good
+                await asyncio.shield(self.put_back(quotes))
+                raise
+
+        self.refill_in_background()
+        return quotes
+
+    async def put_back(self, quotes: list[dict]):
+        """Return quotes that were taken but never got scheduled"""
+        if quotes:
+            await self.pool.insert_many(
+                [{"q": quote["q"], "a": quote["a"], "added": 0} for quote in quotes]
             )
 
-            rand_hour = random.randint(8, 20)
-            rand_minute = random.randint(0, 59)
-            schedule_datetime = datetime.combine(date, datetime.min.time()).replace(
-                hour=rand_hour, minute=rand_minute
+
+QUOTE_PROVIDER = QuoteProvider()
+
+
+class ScheduleDates:
+    """
+    A channel's scheduled dates as sorted, merged [start, end] ranges of date ordinals.
+    Membership and next-free-date are a bisect over the range starts.
+    New runs are only appended to SCHEDULE_DB; the docs are merged on load
+    and rewritten once they get much more fragmented than the merged ranges.
+    """
+
+    def __init__(self, channel_id: int, db=SCHEDULE_DB):
+        self.channel_id = channel_id
+        self.db = db
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.stored_runs = 0
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def query(self) -> dict:
+        if self.channel_id == YOUR_CHANNEL_ID:
+            # Runs saved before channels were tracked belong to the original channel
+            return {"channel": {"$in": [self.channel_id, None]}}
+        return {"channel": self.channel_id}
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in zip(self.starts, self.ends))
+
+    def __contains__(self, day: Date) -> bool:
+        ordinal = day.toordinal()
+        idx = bisect_right(self.starts, ordinal) - 1
+        return idx >= 0 and ordinal <= self.ends[idx]
+
+    def _insert(self, start: int, end: int):
+        idx = bisect_right(self.starts, start)
+
+        # Merge with the previous range if they overlap or touch
+        if idx and self.ends[idx - 1] >= start - 1:
+            idx -= 1
+            start = self.starts[idx]
+            end = max(end, self.ends[idx])
+            del self.starts[idx], self.ends[idx]
+
+        # Swallow every following range this one reaches
+        while idx < len(self.starts) and self.starts[idx] <= end + 1:
+            end = max(end, self.ends[idx])
+            del self.starts[idx], self.ends[idx]
+
+        self.starts.insert(idx, start)
+        self.ends.insert(idx, end)
+
+    @staticmethod
+    def _runs(ordinals: list[int]) -> list[tuple[int, int]]:
+        runs = []
+        for ordinal in sorted(set(ordinals)):
+            if runs and runs[-1][1] == ordinal - 1:
+                runs[-1][1] = ordinal
+            else:
+                runs.append([ordinal, ordinal])
+        return [tuple(run) for run in runs]
+
+    async def load(self, reload: bool = False):
+        async with self._lock:
+            if self.loaded and not reload:
+                return
+
+            self.starts, self.ends = [], []
+            self.stored_runs = 0
+            async for doc in self.db.find(self.query):
+                self._insert(doc["start"], doc["end"])
+                self.stored_runs += 1
+
+            # Only ever once, an emptied schedule mustn't bring the old dates back
+            if self.channel_id == YOUR_CHANNEL_ID and not await QUOTES_META_DB.find_one(
+                {"_id": "cache_imported"}
+            ):
+                if self.stored_runs or await self._import_cache_message():
+                    await QUOTES_META_DB.add_data({"_id": "cache_imported"})
+
+            self.loaded = True
+
+    async def _import_cache_message(self) -> bool:
+        """
+        One-time import of the old JSON cache message.
+        Returns False if the message couldn't be read, so a later load tries again.
+        """
+        try:
+            cache_msg = await bot.get_messages(chat_id=CACHE_CHAT_ID, message_ids=CACHE_MSG_ID)
+        except Exception as e:
+            await bot.log_text(text=f"#QUOTES\nCouldn't read the old date cache: {e}", type="error")
+            return False
+
+        # A missing or unparsable message really has no dates to import
+        try:
+            dates = [
+                datetime.strptime(d, "%Y-%m-%d").date()
+                for d in json.loads(cache_msg.text or "[]")
+                if d.strip()
+            ]
+        except (TypeError, ValueError, AttributeError):
+            return True
+
+        await self._append([d.toordinal() for d in dates])
+        return True
+
+    async def _append(self, ordinals: list[int]):
+        runs = self._runs(ordinals)
+        if not runs:
+            return
+
+        await self.db.insert_many(
+            [{"channel": self.channel_id, "start": start, "end": end} for start, end in runs]
+        )
+        self.stored_runs += len(runs)
+        for start, end in runs:
+            self._insert(start, end)
+
+        if self.stored_runs > 2 * len(self.starts) + 16:
+            await self._compact()
+
+    async def _compact(self):
+        """Rewrite the docs as the merged ranges, new docs first so a crash never loses dates"""
+        old_ids = [doc["_id"] async for doc in self.db.find(self.query, {"_id": 1})]
+        if self.starts:
+            await self.db.insert_many(
+                [
+                    {"channel": self.channel_id, "start": start, "end": end}
+                    for start, end in zip(self.starts, self.ends)
+                ]
             )
+        if old_ids:
+            await self.db.delete_many({"_id": {"$in": old_ids}})
+        self.stored_runs = len(self.starts)
+
+    async def add(self, dates: list[Date]):
+        await self.load()
+        async with self._lock:
+            await self._append([d.toordinal() for d in dates if d not in self])
+
+    async def replace(self, dates: list[Date], since: Date) -> tuple[int, int]:
+        """
+        Make dates the only scheduled dates from since on, keeping the ones before.
+        Returns how many dates were (added, removed).
+        """
+        await self.load()
+        async with self._lock:
+            since_ordinal = since.toordinal()
+            kept: set[int] = set()
+            old: set[int] = set()
+            for start, end in zip(self.starts, self.ends):
+                for ordinal in range(start, end + 1):
+                    (old if ordinal >= since_ordinal else kept).add(ordinal)
+
+            new = {d.toordinal() for d in dates if d >= since}
+            if new == old:
+                return 0, 0
+
+            self.starts, self.ends = [], []
+            for start, end in self._runs(list(kept | new)):
+                self._insert(start, end)
+            await self._compact()
+            return len(new - old), len(old - new)
+
+    def next_free(self, after: Date) -> Date:
+        """First unscheduled date on or after the given one"""
+        ordinal = after.toordinal()
+        idx = bisect_right(self.starts, ordinal) - 1
+        if idx >= 0 and ordinal <= self.ends[idx]:
+            # Ranges are merged, so the day after one always is free
+            ordinal = self.ends[idx] + 1
+        return Date.fromordinal(ordinal)
+
+    async def free_dates(self, count: int, after: Date, until: Date | None = None) -> list[Date]:
+        """Up to count free dates from after on, stopping past until if given"""
+        await self.load()
+        dates = []
+        day = after
+        while len(dates) < count:
+            day = self.next_free(day)
+            if until and day > until:
+                break
+            dates.append(day)
+            day += timedelta(days=1)
+        return dates
+
+
+CHANNEL_DATES: dict[int, ScheduleDates] = {}
+# Channel id -> hash of its scheduled messages as last seen, for GetScheduledHistory
+SCHEDULED_HASHES: dict[int, int] = {}
+# One scheduling run at a time, so manual and auto-fill runs never pick the same dates
+SCHEDULE_LOCK = asyncio.Lock()
+AUTOFILL_TASK: asyncio.Task | None = None
+# Manual .quotes runs in flight, referenced so they aren't garbage collected
+SCHEDULE_RUNS: set[asyncio.Task] = set()
+
+
+def vector_hash(numbers: list[int]) -> int:
+    """Telegram's pagination hash over a list of ids, as a signed 64-bit int"""
+    value = 0
+    for number in numbers:
+        value ^= value >> 21
+        value ^= (value << 35) & 0xFFFFFFFFFFFFFFFF
+        value ^= value >> 4
+        value = (value + number) & 0xFFFFFFFFFFFFFFFF
+    return value - (1 << 64) if value >= 1 << 63 else value
 
-            await bot.send_message(
-                chat_id=YOUR_CHANNEL_ID,
-                text=text,
-                parse_mode=ParseMode.HTML,  # Corrected usage of ParseMode.HTML
-                schedule_date=schedule_datetime,
+
+async def reconcile_channel(channel_id: int) -> tuple[int, int] | None:
+    """
+    Rebuild a channel's upcoming dates from its scheduled messages on the server.
+    The hash of the last fetch is sent along, so an unchanged schedule costs one
+    tiny MessagesNotModified reply. Returns (added, removed) or None if unchanged.
+    """
+    peer = await PEER_CACHE.resolve_peer(channel_id)
+    result = await bot.invoke(
+        raw.functions.messages.GetScheduledHistory(
+            peer=peer, hash=SCHEDULED_HASHES.get(channel_id, 0)
+        )
+    )
+    if isinstance(result, raw.types.messages.MessagesNotModified):
+        return None
+
+    messages = [msg for msg in result.messages if isinstance(msg, raw.types.Message)]
+    SCHEDULED_HASHES[channel_id] = vector_hash(
+        [number for msg in messages for number in (msg.id, msg.edit_date or 0, msg.date)]
+    )
+
+    # Scheduled messages carry their send time as the date, in the same local time they were picked in
+    dates = [datetime.fromtimestamp(msg.date).date() for msg in messages]
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    return await channel_dates(channel_id).replace(dates, since=tomorrow)
+
+
+def channel_dates(channel_id: int) -> ScheduleDates:
+    if channel_id not in CHANNEL_DATES:
+        CHANNEL_DATES[channel_id] = ScheduleDates(channel_id)
+    return CHANNEL_DATES[channel_id]
+
+
+async def init_task():
+    # Seed the original channel once, removing every channel with .qchannel del must stick
+    if not await QUOTES_META_DB.find_one({"_id": "channel_seeded"}):
+        if not await QUOTE_CHANNELS.count_documents():
+            await QUOTE_CHANNELS.add_data(
+                {"_id": YOUR_CHANNEL_ID, "username": YOUR_USERNAME, "template": DEFAULT_TEMPLATE}
             )
+        await QUOTES_META_DB.add_data({"_id": "channel_seeded"})
+    await start_autofill()
 
-            scheduled_dates.append(date.strftime("%Y-%m-%d"))
 
-        except Exception as e:
-            await message.reply(f"❌ Failed to schedule quote for {date}: {e}")
-            continue
+async def start_autofill():
+    """Start auto-fill if QUOTES_DAYS_AHEAD or any channel's days_ahead asks for it"""
+    global AUTOFILL_TASK
+    if AUTOFILL_TASK and not AUTOFILL_TASK.done():
+        return
+    if QUOTES_DAYS_AHEAD > 0 or [c async for c in QUOTE_CHANNELS.find() if c.get("days_ahead")]:
+        AUTOFILL_TASK = asyncio.create_task(autofill_quotes())
+
 
-    # Step 4: Update cache message only if there's a new change
-    updated_cache = existing_dates + [datetime.strptime(d, "%Y-%m-%d").date() for d in scheduled_dates]
-    updated_cache = sorted(set(updated_cache))
-    updated_cache_strings = [d.strftime("%Y-%m-%d") for d in updated_cache]
+def format_quote(quote: dict, channel: dict) -> str:
+    template = channel.get("template") or DEFAULT_TEMPLATE
+    return template.format(quote=quote["q"], author=quote["a"], username=channel["username"])
 
-    # Only update the cache if there's an actual change
-    if updated_cache_strings != json.loads(cache_msg.text):
+
+def random_post_time(day: Date) -> datetime:
+    rand_hour = random.randint(8, 20)
+    rand_minute = random.randint(0, 59)
+    return datetime.combine(day, datetime.min.time()).replace(hour=rand_hour, minute=rand_minute)
+
+
+async def schedule_dates(
+    slots: list[tuple[dict, Date]]
+) -> tuple[dict[int, list[Date]], dict[tuple[int, Date], str]]:
+    """
+    Schedule one quote per (channel, date) slot, all fed from the one quote pool.
+    A producer pulls quotes from the pool in batches onto a bounded queue,
+    SEND_CONCURRENCY consumers send them. A FloodWait pauses every consumer.
+    A BadRequest (e.g. SCHEDULE_TOO_MUCH, the per-chat scheduled message cap)
+    won't go away on a retry, so it fails that channel's remaining slots at once.
+    Other errors retry the slot with backoff up to SEND_RETRIES times.
+    Returns ({channel id: scheduled dates}, {(channel id, date): last error}).
+    """
+    queue: asyncio.Queue[tuple[dict, Date, dict]] = asyncio.Queue(maxsize=SEND_CONCURRENCY * 2)
+    scheduled: dict[int, list[Date]] = defaultdict(list)
+    failed: dict[tuple[int, Date], str] = {}
+    unused: list[dict] = []
+    # Channel id -> the BadRequest that stopped scheduling into it
+    blocked: dict[int, str] = {}
+    flood_until = 0.0
+
+    async def produce():
+        for idx in range(0, len(slots), QUOTES_PER_BATCH):
+            chunk = slots[idx : idx + QUOTES_PER_BATCH]
+            quotes = await QUOTE_PROVIDER.take(len(chunk))
+            for (channel, day), quote in zip(chunk, quotes):
+                await queue.put((channel, day, quote))
+
+    async def send(channel: dict, day: Date, quote: dict):
+        nonlocal flood_until
+        attempt = 0
+        while True:
+            wait = flood_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await bot.send_message(
+                    chat_id=channel["_id"],
+                    text=format_quote(quote, channel),
+                    parse_mode=ParseMode.HTML,
+                    schedule_date=random_post_time(day),
+                )
+                return
+            except FloodWait as e:
+                flood_until = max(flood_until, time.monotonic() + e.value + 1)
+            except BadRequest:
+                raise
+            except Exception:
+                attempt += 1
+                if attempt >= SEND_RETRIES:
+                    raise
+                await asyncio.sleep(2**attempt)
+
+    async def consume():
+        while True:
+            channel, day, quote = await queue.get()
+            channel_id = channel["_id"]
+            try:
+                if channel_id in blocked:
+                    failed[(channel_id, day)] = blocked[channel_id]
+                    unused.append(quote)
+                    continue
+                await send(channel, day, quote)
+                scheduled[channel_id].append(day)
+            except BadRequest as e:
+                blocked[channel_id] = str(e)
+                failed[(channel_id, day)] = str(e)
+                unused.append(quote)
+            except Exception as e:
+                failed[(channel_id, day)] = str(e)
+                unused.append(quote)
+            finally:
+                queue.task_done()
+
+    consumers = [asyncio.create_task(consume()) for _ in range(SEND_CONCURRENCY)]
+    try:
         try:
-            await bot.edit_message_text(
-                chat_id=CACHE_CHAT_ID,
-                message_id=CACHE_MSG_ID,
-                text=json.dumps(updated_cache_strings, indent=2)
-            )
+            await produce()
+        finally:
+            # Let the consumers drain what is already queued
+            await queue.join()
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        # Save whatever made it, even if the producer failed half way
+        for channel_id, days in scheduled.items():
+            await channel_dates(channel_id).add(days)
+        await QUOTE_PROVIDER.put_back(unused)
+
+    return {channel_id: sorted(days) for channel_id, days in scheduled.items()}, failed
+
+
+async def schedule_next(
+    count: int, fill: bool = False, channel_id: int | None = None
+) -> tuple[dict[int, list[Date]], dict[tuple[int, Date], str]]:
+    """
+    Schedule the next count free dates from tomorrow on, in every channel
+    or just channel_id, in one pass. With fill, only dates within each
+    channel's days_ahead window are used.
+    """
+    async with SCHEDULE_LOCK:
+        today = datetime.now().date()
+        tomorrow = today + timedelta(days=1)
+        slots: list[tuple[dict, Date]] = []
+
+        async for channel in QUOTE_CHANNELS.find():
+            if channel_id and channel["_id"] != channel_id:
+                continue
+            try:
+                await reconcile_channel(channel["_id"])
+            except Exception as e:
+                # Fall back to the local index rather than skipping the channel
+                await bot.log_text(
+                    text=f"#QUOTES\nCouldn't sync {channel['_id']} with the server: {e}",
+                    type="error",
+                )
+
+            until = None
+            if fill:
+                until = today + timedelta(days=channel.get("days_ahead") or QUOTES_DAYS_AHEAD)
+            dates = await channel_dates(channel["_id"]).free_dates(count, after=tomorrow, until=until)
+            slots.extend((channel, day) for day in dates)
+
+        if not slots:
+            return {}, {}
+
+        # Earliest dates first, across channels, so every batch of quotes is spread over all of them
+        slots.sort(key=lambda slot: slot[1])
+        return await schedule_dates(slots)
+
+
+async def fill_ahead() -> tuple[int, dict[tuple[int, Date], str]]:
+    """
+    Fill every channel's free dates within its days_ahead window,
+    a small chunk at a time with pauses in between so manual runs aren't held up.
+    """
+    total = 0
+
+    while True:
+        scheduled, failed = await schedule_next(AUTOFILL_CHUNK, fill=True)
+        total += sum(len(days) for days in scheduled.values())
+        # Stop on failures instead of hammering the same dates, the next pass retries them
+        if failed or not scheduled:
+            return total, failed
+        await asyncio.sleep(AUTOFILL_PAUSE)
+
+
+async def autofill_quotes():
+    # Give the client time to finish starting up
+    await asyncio.sleep(60)
+
+    while True:
+        try:
+            scheduled, failed = await fill_ahead()
+            if scheduled or failed:
+                text = f"#QUOTES\nAuto-fill scheduled {scheduled} quotes."
+                if failed:
+                    (channel_id, day), error = list(failed.items())[-1]
+                    text += f"\n{len(failed)} dates failed, last: {channel_id} {day}: {error}"
+                await bot.log_text(text=text, type="info" if not failed else "error")
         except Exception as e:
-            return await message.reply(f"✅ Quotes scheduled, but failed to update cache: {e}")
-    else:
-        await message.reply("✅ Quotes scheduled, but no change to cache.")
+            await bot.log_text(text=f"#QUOTES\nAuto-fill failed: {e}", type="error")
+
+        await asyncio.sleep(AUTOFILL_INTERVAL)
+
+
+async def run_schedule_command(message: Message, count: int, channel_id: int | None):
+    try:
+        scheduled, failed = await schedule_next(count, channel_id=channel_id)
+    except Exception as e:
+        return await message.reply(f"❌ Failed to schedule quotes: {e}")
+
+    if not scheduled and not failed:
+        return await message.reply("❌ No quote channels configured, see .qchannel")
+
+    summary = "\n".join(
+        f"<code>{chat_id}</code>: {len(days)}" for chat_id, days in scheduled.items()
+    )
+
+    if failed:
+        errors = "\n".join(
+            f"<code>{chat_id}</code> {day}: {error}"
+            for (chat_id, day), error in sorted(failed.items())
+        )
+        return await message.reply(f"⚠️ Scheduled:\n{summary}\n\nFailed dates:\n{errors}")
+
+    await message.reply(f"✅ Quotes scheduled successfully!\n{summary}")
+
+
+@bot.add_cmd(cmd="quotes")
+async def schedule_quotes(bot: BOT, message: Message):
+    """
+    CMD: QUOTES
+    INFO: Schedule the next N days of quotes in every quote channel.
+    USAGE: .quotes <number_of_quotes> [channel id]
+    """
+    args = message.text.strip().split()
+    if len(args) not in (2, 3) or not args[1].isdigit():
+        return await message.reply("Usage: .quotes <number_of_quotes> [channel id]")
+
+    count = int(args[1])
+    channel_id = None
+    if len(args) == 3:
+        if not args[2].lstrip("-").isdigit():
+            return await message.reply("Usage: .quotes <number_of_quotes> [channel id]")
+        channel_id = int(args[2])
+
+    await message.reply(f"Scheduling {count} quotes per channel in the background...")
+
+    # Don't keep the command waiting on the lock and the sends
+    task = asyncio.create_task(run_schedule_command(message, count, channel_id))
+    SCHEDULE_RUNS.add(task)
+    task.add_done_callback(SCHEDULE_RUNS.discard)
+
+
+@bot.add_cmd(cmd="qchannel")
+async def quote_channel(bot: BOT, message: Message):
+    """
+    CMD: QCHANNEL
+    INFO: Manage the channels quotes are scheduled in.
+    USAGE:
+        .qchannel (list channels)
+        .qchannel add <channel id> <username> [template]
+        .qchannel days <channel id> <days> (auto-fill window, 0 = QUOTES_DAYS_AHEAD)
+        .qchannel del <channel id>
+    Templates take {quote}, {author} and {username} and are sent as HTML.
+    """
+    args = message.text.split(maxsplit=4)
+
+    if len(args) == 1:
+        lines = []
+        async for channel in QUOTE_CHANNELS.find():
+            dates = channel_dates(channel["_id"])
+            await dates.load()
+            days_ahead = channel.get("days_ahead") or QUOTES_DAYS_AHEAD
+            lines.append(
+                f"<code>{channel['_id']}</code> @{channel['username']}"
+                f" ({len(dates)} dates scheduled, auto-fill: {days_ahead or 'off'})"
+            )
+        return await message.reply("\n".join(lines) or "No quote channels.")
+
+    action = args[1]
+    if len(args) < 3 or action not in ("add", "days", "del") or not args[2].lstrip("-").isdigit():
+        return await message.reply(
+            "Usage: .qchannel [add <channel id> <username> [template]"
+            " | days <channel id> <days> | del <channel id>]"
+        )
+
+    channel_id = int(args[2])
+
+    if action == "del":
+        await QUOTE_CHANNELS.delete_data(channel_id)
+        return await message.reply(f"Removed <code>{channel_id}</code> from quote channels.")
+
+    if action == "days":
+        if len(args) < 4 or not args[3].isdigit():
+            return await message.reply("Usage: .qchannel days <channel id> <days>")
+        if not await QUOTE_CHANNELS.find_one({"_id": channel_id}):
+            return await message.reply(f"<code>{channel_id}</code> isn't a quote channel.")
+
+        days_ahead = int(args[3])
+        await QUOTE_CHANNELS.add_data({"_id": channel_id, "days_ahead": days_ahead})
+        await start_autofill()
+        window = days_ahead or QUOTES_DAYS_AHEAD
+        return await message.reply(
+            f"Auto-fill for <code>{channel_id}</code>: "
+            + (f"{window} days ahead." if window else "off.")
+        )
+
+    if len(args) < 4:
+        return await message.reply("Usage: .qchannel add <channel id> <username> [template]")
+
+    channel = {
+        "_id": channel_id,
+        "username": args[3].removeprefix("@"),
+        "template": args[4] if len(args) == 5 else DEFAULT_TEMPLATE,
+    }
+    try:
+        format_quote({"q": "quote", "a": "author"}, channel)
+    except (KeyError, IndexError, ValueError) as e:
+        return await message.reply(f"❌ Bad template: {e}")
+
+    await QUOTE_CHANNELS.add_data(channel)
+    await message.reply(f"Added <code>{channel_id}</code> @{channel['username']} to quote channels.")
+
+
+@bot.add_cmd(cmd="qsync")
+async def sync_quote_channels(bot: BOT, message: Message):
+    """
+    CMD: QSYNC
+    INFO: Rebuild the scheduled dates of every quote channel from its scheduled messages.
+    USAGE: .qsync
+    """
+    lines = []
+    async with SCHEDULE_LOCK:
+        async for channel in QUOTE_CHANNELS.find():
+            try:
+                changes = await reconcile_channel(channel["_id"])
+            except Exception as e:
+                lines.append(f"<code>{channel['_id']}</code>: ❌ {e}")
+                continue
+
+            if not changes or changes == (0, 0):
+                lines.append(f"<code>{channel['_id']}</code>: no change")
+            else:
+                lines.append(f"<code>{channel['_id']}</code>: +{changes[0]} / -{changes[1]} dates")
 
-    await message.reply("✅ Quotes scheduled successfully!")
+    await message.reply("\n".join(lines) or "No quote channels.")
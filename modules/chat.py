@@ -6,6 +6,8 @@ from pyrogram.errors import BadRequest, UserNotParticipant
 from ub_core.utils import get_name
 from app import BOT, Message
 
+from ..utils.peer_cache import PEER_CACHE
+
 
 @BOT.add_cmd(cmd="ids")
 async def get_ids(bot: BOT, message: Message) -> None:
@@ -23,7 +25,7 @@ async def get_ids(bot: BOT, message: Message) -> None:
         if reply_user:
             resp_str += f"<b>{get_name(reply_user)}</b>: <code>{reply_user.id}</code>"
     elif message.input:
-        resp_str: int = (await bot.get_chat(message.input[1:])).id
+        resp_str: int = (await PEER_CACHE.get_chat(message.input[1:]))["id"]
     else:
         resp_str: str = f"<b>{get_name(message.chat)}</b>: <code>{message.chat.id}</code>"
 
@@ -49,11 +51,16 @@ async def join_chat(bot: BOT, message: Message) -> None:
 async def leave_chat(bot: BOT, message: Message) -> None:
     if message.input:
         chat = message.input
+        try:
+            chat = (await PEER_CACHE.get_chat(chat))["id"]
+        except Exception:
+            # Links and the like are left for leave_chat to handle
+            pass
     else:
         chat = message.chat.id
 
     try:
-        me = await bot.get_me()
+        me = bot.me or await bot.get_me()
         member = await bot.get_chat_member(chat, me.id)
 
         # 🚫 BLOCK first – before countdown
@@ -0,0 +1,104 @@
+import asyncio
+from typing import AsyncIterator
+
+from pymongo import DeleteOne, ReplaceOne
+
+from app import CustomDB
+
+_COLLECTIONS: dict[str, "CachedCollection"] = {}
+
+
+class CachedCollection:
+    """
+    Write-through, in-memory copy of a small CustomDB collection.
+    Reads and counts are served from memory after the first load,
+    add_data / delete_data / drop hit the DB first and then the cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.collection = CustomDB[name]
+        self.data: dict[int | str, dict] = {}
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def load(self, reload: bool = False):
+        async with self._load_lock:
+            if self.loaded and not reload:
+                return
+            self.data = {doc["_id"]: doc async for doc in self.collection.find()}
+            self.loaded = True
+
+    @staticmethod
+    def _matches(doc: dict, query: dict | None) -> bool:
+        return not query or all(doc.get(k) == v for k, v in query.items())
+
+    async def find(self, query: dict | None = None) -> AsyncIterator[dict]:
+        await self.load()
+        for doc in list(self.data.values()):
+            if self._matches(doc, query):
+                yield dict(doc)
+
+    async def find_one(self, query: dict | None = None) -> dict | None:
+        async for doc in self.find(query):
+            return doc
+
+    async def count_documents(self, query: dict | None = None) -> int:
+        await self.load()
+        if not query:
+            return len(self.data)
+        return sum(1 for doc in self.data.values() if self._matches(doc, query))
+
+    async def ids(self) -> set[int | str]:
+        await self.load()
+        return set(self.data)
+
+    async def add_data(self, data: dict):
+        await self.load()
+        # CustomDB.add_data may pop _id off the dict it gets.
+        await self.collection.add_data(dict(data))
+        self.data.setdefault(data["_id"], {}).update(data)
+
+    async def delete_data(self, id: int | str) -> bool | None:
+        await self.load()
+        deleted = await self.collection.delete_data(id=id)
+        self.data.pop(id, None)
+        return deleted
+
+    async def bulk_update(self, upserts: list[dict], delete_ids: list[int | str]):
+        """Replace/insert and delete many docs in a single bulk write."""
+        await self.load()
+        ops = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in upserts]
+        ops += [DeleteOne({"_id": _id}) for _id in delete_ids]
+        if not ops:
+            return
+
+        await self.collection.bulk_write(ops, ordered=False)
+
+        for doc in upserts:
+            self.data[doc["_id"]] = dict(doc)
+        for _id in delete_ids:
+            self.data.pop(_id, None)
+
+    async def sync_data(self, docs: dict[int | str, dict]) -> tuple[int, int]:
+        """
+        Make the collection hold exactly docs (keyed by _id),
+        writing only what changed. Returns (upserted, deleted) counts.
+        """
+        await self.load()
+        upserts = [doc for _id, doc in docs.items() if self.data.get(_id) != doc]
+        delete_ids = [_id for _id in self.data if _id not in docs]
+        await self.bulk_update(upserts=upserts, delete_ids=delete_ids)
+        return len(upserts), len(delete_ids)
+
+    async def drop(self):
+        await self.collection.drop()
+        self.data.clear()
+        self.loaded = True
+
+
+def cached_collection(name: str) -> CachedCollection:
+    """Get the shared cache for a collection, so every module sees the same data."""
+    if name not in _COLLECTIONS:
+        _COLLECTIONS[name] = CachedCollection(name)
+    return _COLLECTIONS[name]
@@ -0,0 +1,409 @@
+import asyncio
+import time
+
+from pymongo import ReplaceOne
+from pyrogram import raw, utils
+from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait
+
+from app import CustomDB, bot
+
+from .peer_cache import build_input_peer
+
+# One doc per dialog plus a meta doc holding the newest top message date seen,
+# so later scans can stop early, and when the last full scan ran
+DIALOG_SNAPSHOT_DB = CustomDB["dialog_snapshot"]
+SNAPSHOT_META_ID = "meta"
+
+# Dialog pages fetched ahead while a full scan processes the current one
+DIALOG_PREFETCH_PAGES = 2
+
+# Seconds a snapshot is served before a read triggers an incremental refresh
+DIALOG_SNAPSHOT_TTL = 10 * 60
+
+# Incremental scans miss left chats and rights changed in quiet chats,
+# so a sync is upgraded to a full scan once the last one is this old
+DIALOG_FULL_SCAN_INTERVAL = 6 * 60 * 60
+
+
+def is_raw_admin_group(chat) -> bool:
+    """
+    is_admin_group for raw Chat/Channel objects.
+    Forbidden chats, and basic groups that were deactivated or migrated, are never admin.
+    """
+    if isinstance(chat, raw.types.Channel):
+        return bool(chat.megagroup and (chat.admin_rights or chat.creator))
+    if isinstance(chat, raw.types.Chat):
+        if chat.deactivated or getattr(chat, "migrated_to", None):
+            return False
+        return bool(chat.admin_rights or chat.creator)
+    return False
+
+
+class RawDialog:
+    """Just the fields dialog consumers need, read straight off a raw GetDialogs page"""
+
+    __slots__ = (
+        "id", "access_hash", "type", "title", "username", "admin_rights", "top_message", "date",
+        "pinned",
+    )
+
+    def __init__(
+        self, id, access_hash, type, title, username, admin_rights, top_message, date, pinned
+    ):
+        self.id: int = id
+        self.access_hash: int | None = access_hash
+        self.type: ChatType = type
+        self.title: str = title
+        self.username: str | None = username
+        self.admin_rights: bool = admin_rights
+        self.top_message: int = top_message
+        self.date: int = date
+        self.pinned: bool = pinned
+
+    @classmethod
+    def parse(
+        cls, dialog: raw.types.Dialog, users: dict, chats: dict, dates: dict
+    ) -> "RawDialog | None":
+        peer = dialog.peer
+        chat_id = utils.get_peer_id(peer)
+        common = dict(
+            id=chat_id,
+            top_message=dialog.top_message,
+            date=dates.get(chat_id, 0),
+            pinned=bool(dialog.pinned),
+        )
+
+        if isinstance(peer, raw.types.PeerUser):
+            user = users.get(peer.user_id)
+            if user is None:
+                return
+            return cls(
+                access_hash=getattr(user, "access_hash", None),
+                type=ChatType.BOT if user.bot else ChatType.PRIVATE,
+                title=" ".join(filter(None, (user.first_name, user.last_name))) or "Deleted Account",
+                username=user.username,
+                admin_rights=False,
+                **common,
+            )
+
+        if isinstance(peer, raw.types.PeerChat):
+            chat = chats.get(peer.chat_id)
+            if chat is None:
+                return
+            return cls(
+                access_hash=None,
+                type=ChatType.GROUP,
+                title=chat.title,
+                username=None,
+                admin_rights=is_raw_admin_group(chat),
+                **common,
+            )
+
+        chat = chats.get(peer.channel_id)
+        if chat is None:
+            return
+        megagroup = getattr(chat, "megagroup", False)
+        return cls(
+            access_hash=chat.access_hash,
+            type=ChatType.SUPERGROUP if megagroup else ChatType.CHANNEL,
+            title=chat.title,
+            username=getattr(chat, "username", None),
+            admin_rights=is_raw_admin_group(chat),
+            **common,
+        )
+
+    def to_doc(self) -> dict:
+        return {
+            "_id": self.id,
+            "access_hash": self.access_hash,
+            "type": str(self.type),
+            "title": self.title,
+            "username": self.username,
+            "admin": self.admin_rights,
+            "top_message": self.top_message,
+            "date": self.date,
+            "pinned": self.pinned,
+        }
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "RawDialog":
+        return cls(
+            id=doc["_id"],
+            access_hash=doc.get("access_hash"),
+            type=ChatType[doc["type"].rpartition(".")[2]],
+            title=doc.get("title"),
+            username=doc.get("username"),
+            admin_rights=doc.get("admin", False),
+            top_message=doc.get("top_message", 0),
+            date=doc.get("date", 0),
+            pinned=doc.get("pinned", False),
+        )
+
+    @property
+    def is_admin_group(self) -> bool:
+        return self.admin_rights and self.type in (ChatType.GROUP, ChatType.SUPERGROUP)
+
+    @property
+    def input_peer(self) -> raw.base.InputPeer:
+        return build_input_peer(self.id, self.access_hash)
+
+
+async def fetch_dialog_pages():
+    """
+    Walk every dialog with raw GetDialogs, yielding a page of RawDialog records at a time.
+    Skips the users/chats/messages parsing get_dialogs() does and
+    builds page offsets from access hashes already in hand.
+    """
+    offset_date = 0
+    offset_id = 0
+    offset_peer = raw.types.InputPeerEmpty()
+    seen_dialog_ids = set()
+
+    while True:
+        try:
+            r = await bot.invoke(
+                raw.functions.messages.GetDialogs(
+                    offset_date=offset_date,
+                    offset_id=offset_id,
+                    offset_peer=offset_peer,
+                    limit=100,
+                    hash=0,
+                    exclude_pinned=False,
+                    folder_id=0,
+                ),
+                sleep_threshold=60,
+            )
+        except FloodWait as e:
+            # Longer than sleep_threshold, wait it out and retry the same page
+            await asyncio.sleep(e.value)
+            continue
+
+        users = {i.id: i for i in r.users}
+        chats = {i.id: i for i in r.chats}
+        dates = {
+            utils.get_peer_id(message.peer_id): message.date
+            for message in r.messages
+            if not isinstance(message, raw.types.MessageEmpty)
+        }
+
+        dialogs: list[RawDialog] = []
+        for dialog in r.dialogs:
+            if not isinstance(dialog, raw.types.Dialog):
+                continue
+            parsed = RawDialog.parse(dialog, users, chats, dates)
+            if parsed is None or parsed.id in seen_dialog_ids:
+                continue
+            seen_dialog_ids.add(parsed.id)
+            dialogs.append(parsed)
+
+        if not dialogs:
+            return
+
+        yield dialogs
+
+        last = dialogs[-1]
+        if not last.date:
+            return
+
+        offset_id = last.top_message
+        offset_date = last.date
+        offset_peer = last.input_peer
+
+
+async def iter_raw_dialogs(prefetch: int = 0):
+    """
+    Yield RawDialog records for every dialog.
+    With prefetch, up to that many pages are fetched ahead in the background,
+    so the next GetDialogs call is in flight while the current page is used.
+    """
+    pages = fetch_dialog_pages()
+
+    if not prefetch:
+        async for page in pages:
+            for dialog in page:
+                yield dialog
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+
+    async def read_ahead():
+        try:
+            async for page in pages:
+                await queue.put(page)
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+
+    task = asyncio.create_task(read_ahead())
+    try:
+        while (page := await queue.get()) is not None:
+            if isinstance(page, Exception):
+                raise page
+            for dialog in page:
+                yield dialog
+    finally:
+        task.cancel()
+
+
+class DialogSnapshot:
+    """
+    One in-memory index of every dialog, by id, type and admin status,
+    persisted in DIALOG_SNAPSHOT_DB and shared by every module that lists dialogs.
+    Reads within the TTL cost nothing, and concurrent refreshes share a single scan.
+    """
+
+    def __init__(self, ttl: int = DIALOG_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self.dialogs: dict[int, RawDialog] = {}
+        self.by_type: dict[ChatType, dict[int, RawDialog]] = {}
+        self.last_date = 0
+        self.full_synced_at = 0.0
+        self.updated_at = 0.0
+        # Dialogs walked by the running scan, for progress reports
+        self.scanned = 0
+        self.loaded = False
+        self._scan: asyncio.Task | None = None
+        self._scan_full = False
+
+    def _index(self, dialog: RawDialog):
+        old = self.dialogs.get(dialog.id)
+        if old is not None and old.type != dialog.type:
+            self.by_type[old.type].pop(dialog.id, None)
+        self.dialogs[dialog.id] = dialog
+        self.by_type.setdefault(dialog.type, {})[dialog.id] = dialog
+
+    def _unindex(self, chat_id: int):
+        dialog = self.dialogs.pop(chat_id, None)
+        if dialog is not None:
+            self.by_type[dialog.type].pop(chat_id, None)
+
+    async def _load(self):
+        async for doc in DIALOG_SNAPSHOT_DB.find():
+            if doc["_id"] == SNAPSHOT_META_ID:
+                self.last_date = doc["last_date"]
+                self.full_synced_at = doc.get("full_synced_at", 0.0)
+                continue
+            self._index(RawDialog.from_doc(doc))
+        self.loaded = True
+
+    async def _sync(self, full: bool):
+        """
+        Bring the snapshot up to date.
+        Dialogs come newest first, so unless full is set the scan stops at the
+        first unpinned dialog with no activity since the last sync.
+        A full scan also drops dialogs that are gone (left/deleted chats).
+        """
+        if not self.loaded:
+            await self._load()
+
+        last_date = 0 if full else self.last_date
+        newest_date = last_date
+        changed: list[dict] = []
+        seen_ids = set()
+        self.scanned = 0
+
+        # Incremental syncs usually stop on the first page, read ahead only on full scans
+        prefetch = 0 if last_date else DIALOG_PREFETCH_PAGES
+
+        async for d in iter_raw_dialogs(prefetch=prefetch):
+            # Full scans (last_date 0) walk everything, a dialog without a
+            # top message date mustn't end them early
+            if last_date and not d.pinned and d.date <= last_date:
+                break
+
+            newest_date = max(newest_date, d.date)
+            seen_ids.add(d.id)
+            self.scanned += 1
+
+            doc = d.to_doc()
+            old = self.dialogs.get(d.id)
+            if old is None or old.to_doc() != doc:
+                changed.append(doc)
+            self._index(d)
+
+        stale_ids = set(self.dialogs) - seen_ids if full else set()
+        for chat_id in stale_ids:
+            self._unindex(chat_id)
+
+        if changed:
+            await DIALOG_SNAPSHOT_DB.bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in changed],
+                ordered=False,
+            )
+        if stale_ids:
+            await DIALOG_SNAPSHOT_DB.delete_many({"_id": {"$in": list(stale_ids)}})
+
+        self.last_date = max(self.last_date if not full else 0, newest_date)
+        if full:
+            self.full_synced_at = time.time()
+        await DIALOG_SNAPSHOT_DB.replace_one(
+            {"_id": SNAPSHOT_META_ID},
+            {
+                "_id": SNAPSHOT_META_ID,
+                "last_date": self.last_date,
+                "full_synced_at": self.full_synced_at,
+            },
+            upsert=True,
+        )
+        self.updated_at = time.time()
+
+    async def refresh(self, full: bool = False):
+        """Sync now, joining a scan that is already running instead of starting another"""
+        scan = self._scan
+        if scan and not scan.done():
+            if self._scan_full or not full:
+                return await asyncio.shield(scan)
+            # A full scan was asked for while an incremental one runs, start it after that one
+            await asyncio.wait([scan])
+            if self._scan is not scan and not self._scan.done():
+                return await self.refresh(full=full)
+
+        self._scan_full = full
+        self._scan = asyncio.create_task(self._sync(full=full))
+        await asyncio.shield(self._scan)
+
+    async def get(self, refresh: bool = False, full: bool = False) -> "DialogSnapshot":
+        """
+        The snapshot, synced first if asked to or if it's older than the TTL.
+        The sync is a full scan when asked for or when the last one is overdue.
+        """
+        if not self.loaded:
+            await self._load()
+        full = full or time.time() - self.full_synced_at > DIALOG_FULL_SCAN_INTERVAL
+        if refresh or full or time.time() - self.updated_at > self.ttl:
+            await self.refresh(full=full)
+        return self
+
+    @property
+    def scanning(self) -> bool:
+        return self._scan is not None and not self._scan.done()
+
+    async def get_current(self, rescan: bool = False) -> "DialogSnapshot":
+        """
+        The snapshot as of a full scan no older than the TTL, so chats that were
+        left aren't in it. A recent full scan is reused, rescan forces a new one.
+        """
+        if not self.loaded:
+            await self._load()
+        stale = time.time() - self.full_synced_at > self.ttl
+        return await self.get(full=rescan or stale)
+
+    def of_type(self, *chat_types: ChatType) -> list[RawDialog]:
+        return [d for chat_type in chat_types for d in self.by_type.get(chat_type, {}).values()]
+
+    def admin_groups(self) -> list[RawDialog]:
+        return [d for d in self.of_type(ChatType.GROUP, ChatType.SUPERGROUP) if d.admin_rights]
+
+    async def mark_not_admin(self, chat_ids: list[int]):
+        """Record lost admin rights found outside a scan, so incremental syncs don't miss it"""
+        for chat_id in chat_ids:
+            if chat_id in self.dialogs:
+                self.dialogs[chat_id].admin_rights = False
+        if chat_ids:
+            await DIALOG_SNAPSHOT_DB.update_many(
+                {"_id": {"$in": chat_ids}}, {"$set": {"admin": False}}
+            )
+
+
+DIALOG_SNAPSHOT = DialogSnapshot()
@@ -1,51 +1,232 @@
 # Made by @wwhyafk
 
+import asyncio
+import csv
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterable
+
+from pyrogram.enums import ChatType
+
 from app import BOT, bot, Message
 
-async def _list_dialogs(bot: BOT, message: Message, chat_type: str):
+from .dialog_snapshot import DIALOG_SNAPSHOT, RawDialog
+
+# Sections of the .listchats export, in order
+CHAT_CATEGORIES: dict[ChatType, str] = {
+    ChatType.CHANNEL: "Channels",
+    ChatType.SUPERGROUP: "Supergroups",
+    ChatType.GROUP: "Basic Groups",
+    ChatType.BOT: "Bots",
+    ChatType.PRIVATE: "Private Chats",
+}
+
+# Export flag -> file extension, plain text when no flag is given
+EXPORT_FORMATS: dict[str, str] = {"-csv": "csv", "-json": "jsonl"}
+
+# Seconds between progress edits while dialogs are being scanned
+PROGRESS_INTERVAL = 5
+
+
+def _get_link(dialog: RawDialog) -> str:
+    if dialog.username:
+        return f"https://t.me/{dialog.username}"
+    if dialog.type in (ChatType.PRIVATE, ChatType.BOT):
+        return f"tg://user?id={dialog.id}"
+    return f"tg://openmessage?chat_id={dialog.id}"
+
+
+def _format_dialog(dialog: RawDialog) -> str:
+    name = dialog.title or "Unknown"
+    return f"**Name:** {name}\n**ID:** `{dialog.id}`\n**Link:** {_get_link(dialog)}\n"
+
+
+class ChatExporter:
     """
-    chat_type = "SUPERGROUP" or "CHANNEL"
+    Writes export rows into temp files as it goes,
+    instead of building the whole export up as one string.
+    Text exports keep one temp file per category and are joined into sections at the end,
+    CSV / JSON Lines rows carry their category and go into a single file.
     """
-    response_lines = []
-    count = 0
 
-    async for dialog in bot.client.get_dialogs():
-        chat = dialog.chat
-        if chat_type in str(chat.type):
-            count += 1
-            name = getattr(chat, "title", "Unknown")
-            chat_id = chat.id
-            username = getattr(chat, "username", None)
+    def __init__(self, extension: str, sections: bool):
+        self.extension = extension
+        self.sections = sections
+        self.count = 0
+        self.counts: dict[ChatType, int] = {chat_type: 0 for chat_type in CHAT_CATEGORIES}
+        self._files: dict[ChatType | None, "tempfile._TemporaryFileWrapper"] = {}
+        self._csv = None
+
+    def _file(self, key: ChatType | None):
+        if key not in self._files:
+            self._files[key] = tempfile.NamedTemporaryFile(
+                mode="w+", encoding="utf-8", newline="", suffix=f".{self.extension}", delete=False
+            )
+        return self._files[key]
 
-            if username:
-                link = f"https://t.me/{username}"
-            else:
-                link = f"tg://openmessage?chat_id={chat_id}"
+    def add(self, dialog: RawDialog):
+        self.count += 1
+        self.counts[dialog.type] += 1
+        category = CHAT_CATEGORIES[dialog.type]
+
+        if self.extension == "csv":
+            if self._csv is None:
+                self._csv = csv.writer(self._file(None))
+                self._csv.writerow(["category", "name", "id", "username", "link"])
+            self._csv.writerow(
+                [category, dialog.title or "", dialog.id, dialog.username or "", _get_link(dialog)]
+            )
 
-            response_lines.append(
-                f"**Name:** {name}\n**ID:** `{chat_id}`\n**Link:** {link}\n"
+        elif self.extension == "jsonl":
+            row = dict(
+                category=category,
+                name=dialog.title,
+                id=dialog.id,
+                username=dialog.username,
+                link=_get_link(dialog),
             )
+            self._file(None).write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        else:
+            file = self._file(dialog.type if self.sections else None)
+            if file.tell():
+                file.write("\n")
+            file.write(_format_dialog(dialog))
+
+    def finish(self) -> str:
+        """Close the temp files and return the path of the file to upload"""
+        if not self.sections or self.extension != "txt":
+            file = self._file(None)
+            file.close()
+            return file.name
+
+        output = tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", suffix=".txt", delete=False
+        )
+        with output:
+            for chat_type, name in CHAT_CATEGORIES.items():
+                part = self._files.pop(chat_type, None)
+                if part is None:
+                    continue
+                if output.tell():
+                    output.write("\n")
+                output.write(f"===== {name} ({self.counts[chat_type]}) =====\n\n")
+                part.seek(0)
+                shutil.copyfileobj(part, output)
+                part.close()
+                os.remove(part.name)
+        self._files[None] = output
+        return output.name
+
+    def cleanup(self):
+        for file in self._files.values():
+            file.close()
+            if os.path.exists(file.name):
+                os.remove(file.name)
+        self._files = {}
+
 
-    if count == 0:
-        await message.reply(f"⚠️ No {chat_type.lower()}s found.")
-        return
+async def _export_dialogs(
+    message: Message, progress: Message, dialogs: Iterable[RawDialog], label: str, sections: bool
+):
+    extension = next((ext for flag, ext in EXPORT_FORMATS.items() if flag in message.flags), "txt")
+    exporter = ChatExporter(extension=extension, sections=sections)
 
-    result = "\n".join(response_lines)
-    filename = f"{chat_type.lower()}s.txt"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(result)
+    try:
+        # No awaits in here, so the snapshot can't change under the loop
+        for dialog in dialogs:
+            if dialog.type not in CHAT_CATEGORIES:
+                continue
+            exporter.add(dialog)
 
-    await message.reply_document(filename, caption=f"📜 Found {count} {chat_type.lower()}s.")
+        if exporter.count == 0:
+            await message.reply(f"⚠️ No {label} found.")
+            return
+
+        path = exporter.finish()
+
+        caption = f"📜 Found {exporter.count} {label}"
+        if sections:
+            caption += ": " + ", ".join(
+                f"{exporter.counts[chat_type]} {name.lower()}"
+                for chat_type, name in CHAT_CATEGORIES.items()
+            )
+        await message.reply_document(path, caption=f"{caption}.", file_name=f"{label}.{extension}")
+        await progress.delete()
+
+    finally:
+        exporter.cleanup()
+
+
+async def _get_snapshot(message: Message, progress: Message):
+    """
+    Dialogs as of a recent full scan, since incremental syncs can't see chats that were left.
+    Back to back list commands share one scan, -r forces a new one.
+    While a scan runs, progress shows how far it got every PROGRESS_INTERVAL seconds.
+    """
+    task = asyncio.create_task(DIALOG_SNAPSHOT.get_current(rescan="-r" in message.flags))
+
+    while True:
+        done, _ = await asyncio.wait([task], timeout=PROGRESS_INTERVAL)
+        if done:
+            return task.result()
+        if DIALOG_SNAPSHOT.scanning:
+            try:
+                await progress.edit(f"🔍 Scanned {DIALOG_SNAPSHOT.scanned} chats...")
+            except Exception:
+                pass
+
+
+async def _list_dialogs(bot: BOT, message: Message, progress: Message, chat_type: str):
+    """
+    chat_type = "SUPERGROUP" or "CHANNEL"
+    """
+    # -r: rescan every dialog even if a recent full scan exists
+    snapshot = await _get_snapshot(message, progress)
+
+    await _export_dialogs(
+        message=message,
+        progress=progress,
+        dialogs=snapshot.of_type(ChatType[chat_type]),
+        label=f"{chat_type.lower()}s",
+        sections=False,
+    )
 
 
 @bot.add_cmd(cmd="listchannels")
 async def list_channels(bot: BOT, message: Message):
-    await message.reply("🔍 Fetching channels... please wait.")
-    await _list_dialogs(bot, message, chat_type="CHANNEL")
+    progress = await message.reply("🔍 Fetching channels... please wait.")
+    await _list_dialogs(bot, message, progress, chat_type="CHANNEL")
 
 
 @bot.add_cmd(cmd="listgroups")
 async def list_groups(bot: BOT, message: Message):
-    await message.reply("🔍 Fetching groups... please wait.")
-    await _list_dialogs(bot, message, chat_type="SUPERGROUP")
+    progress = await message.reply("🔍 Fetching groups... please wait.")
+    await _list_dialogs(bot, message, progress, chat_type="SUPERGROUP")
+
+
+@bot.add_cmd(cmd="listchats")
+async def list_all_chats(bot: BOT, message: Message):
+    """
+    CMD: LISTCHATS
+    INFO: Export every chat in one file, split into
+        channels, supergroups, basic groups, bots and private chats.
+    FLAGS:
+        -r to rescan every dialog even if a recent full scan exists
+        -csv / -json for CSV or JSON Lines instead of text
+    USAGE: .listchats | .listchats -r -csv
+    """
+    progress = await message.reply("🔍 Fetching chats... please wait.")
+
+    snapshot = await _get_snapshot(message, progress)
 
+    # Single pass, each dialog goes straight to its category
+    await _export_dialogs(
+        message=message,
+        progress=progress,
+        dialogs=snapshot.dialogs.values(),
+        label="chats",
+        sections=True,
+    )
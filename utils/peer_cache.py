@@ -0,0 +1,167 @@
+import re
+import time
+from collections import OrderedDict
+
+from pyrogram import raw, utils
+from ub_core.utils.helpers import get_name
+
+from app import CustomDB, bot
+
+# Peer ID / username -> resolved chat info, survives restarts
+PEER_CACHE_DB = CustomDB["peer_cache"]
+
+# Usernames are case-insensitive, anything else (invite links...) is kept as given
+USERNAME_REGEX = re.compile(r"@?([a-zA-Z]\w{3,31})")
+
+
+def build_input_peer(chat_id: int, access_hash: int | None) -> raw.base.InputPeer:
+    """InputPeer from a known chat id + access hash, without a resolve_peer round trip"""
+    peer_type = utils.get_peer_type(chat_id)
+    if peer_type == "channel":
+        return raw.types.InputPeerChannel(
+            channel_id=utils.get_channel_id(chat_id), access_hash=access_hash
+        )
+    if peer_type == "chat":
+        return raw.types.InputPeerChat(chat_id=-chat_id)
+    return raw.types.InputPeerUser(user_id=chat_id, access_hash=access_hash or 0)
+
+
+def get_input_peer_id(peer: raw.base.InputPeer) -> int:
+    """Bot API style chat ID of an InputPeer"""
+    if isinstance(peer, raw.types.InputPeerChannel):
+        return utils.get_channel_id(peer.channel_id)
+    if isinstance(peer, raw.types.InputPeerChat):
+        return -peer.chat_id
+    return getattr(peer, "user_id", 0)
+
+
+class PeerCache:
+    """
+    Process-wide LRU cache of peer id / username -> chat info, with a TTL.
+    Misses fall back to PEER_CACHE_DB and only then to the API,
+    so repeat lookups, even across restarts, make no resolution calls.
+    Hits are also handed to pyrogram's peer storage, so the cached id can be
+    passed straight to client methods after a restart with an in-memory session.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl: int = 24 * 60 * 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[int | str, dict] = OrderedDict()
+        self.registered: set[int] = set()
+
+    @staticmethod
+    def normalize(key: int | str) -> int | str:
+        if isinstance(key, int):
+            return key
+        key = key.strip()
+        if key.lstrip("-").isdigit():
+            return int(key)
+        if match := USERNAME_REGEX.fullmatch(key):
+            return match.group(1).lower()
+        return key
+
+    def _remember(self, entry: dict):
+        keys = [entry["id"]]
+        if entry.get("username"):
+            keys.append(entry["username"].lower())
+        for key in keys:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def _register(self, entry: dict):
+        """Feed a cached peer into pyrogram's storage via fetch_peers, once per process"""
+        chat_id = entry["id"]
+        if chat_id in self.registered or not entry.get("access_hash"):
+            return
+
+        chat_type = entry.get("type") or ""
+        peer_type = utils.get_peer_type(chat_id)
+        if peer_type == "channel":
+            peer = raw.types.Channel(
+                id=utils.get_channel_id(chat_id),
+                title=entry.get("title") or "",
+                photo=raw.types.ChatPhotoEmpty(),
+                date=0,
+                access_hash=entry["access_hash"],
+                username=entry.get("username"),
+                megagroup="SUPERGROUP" in chat_type,
+                broadcast="CHANNEL" in chat_type,
+            )
+        elif peer_type == "user":
+            peer = raw.types.User(
+                id=chat_id,
+                access_hash=entry["access_hash"],
+                username=entry.get("username"),
+                bot="BOT" in chat_type,
+            )
+        else:
+            # Basic groups need no access hash, pyrogram resolves them on its own
+            return
+
+        await bot.fetch_peers([peer])
+        self.registered.add(chat_id)
+
+    async def _store(self, entry: dict):
+        entry["cached_at"] = int(time.time())
+        self._remember(entry)
+        # Fetched through pyrogram, so its storage already has the peer
+        self.registered.add(entry["id"])
+        await PEER_CACHE_DB.add_data({"_id": entry["id"], **entry})
+
+    async def _lookup(self, key: int | str) -> dict | None:
+        entry = self.entries.get(key)
+
+        if entry is None:
+            query = {"_id": key} if isinstance(key, int) else {"username": key}
+            entry = await PEER_CACHE_DB.find_one(query)
+            if entry is None:
+                return
+            entry.pop("_id", None)
+
+        if time.time() - entry["cached_at"] > self.ttl:
+            self.entries.pop(key, None)
+            return
+
+        self._remember(entry)
+        await self._register(entry)
+        return entry
+
+    async def get_chat(self, key: int | str) -> dict:
+        """Cached id, title, username, type and access hash of a chat/user"""
+        key = self.normalize(key)
+        entry = await self._lookup(key)
+        if entry and "title" in entry:
+            return entry
+
+        chat = await bot.get_chat(key)
+        entry = {
+            "id": chat.id,
+            "title": get_name(chat),
+            "username": (chat.username or "").lower() or None,
+            "type": str(chat.type),
+            "access_hash": getattr(getattr(chat, "_raw", None), "access_hash", None),
+        }
+        await self._store(entry)
+        return entry
+
+    async def resolve_peer(self, key: int | str) -> raw.base.InputPeer:
+        """Cached bot.resolve_peer"""
+        key = self.normalize(key)
+        entry = await self._lookup(key)
+        if entry and (entry["access_hash"] or utils.get_peer_type(entry["id"]) == "chat"):
+            return build_input_peer(entry["id"], entry["access_hash"])
+
+        peer = await bot.resolve_peer(key)
+        entry = {
+            "id": get_input_peer_id(peer),
+            "username": key if isinstance(key, str) else None,
+            "access_hash": getattr(peer, "access_hash", None),
+        }
+        await self._store(entry)
+        return peer
+
+
+PEER_CACHE = PeerCache()